@@ -1,3 +1,4 @@
+import os
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 
@@ -5,7 +6,19 @@ import numpy as np
 import pandas as pd
 import vectorbt as vbt
 
+import settings
+from backtesting.combined import as_levels, evaluate_combined, make_combined_grid
+from backtesting.export import export_results
+from backtesting.grid import as_windows, evaluate_grid, evaluate_window, make_grid, metric_names, portfolio_metrics
+from backtesting.kernels import INIT_CASH
+from backtesting.multi_asset import ASSET_LEVEL, as_wide, evaluate_assets
+from backtesting.result_cache import ResultCache, evaluate_grid_cached, series_hash
+from backtesting.search import adaptive_search
+from backtesting.walkforward import walk_forward
+from profiling import profiled, span
+from scraping.resample import Resampler
 from scraping.scraper import Scraper
+from scraping.store import CandleStore
 
 
 class BaseBacktester(ABC):
@@ -13,6 +26,9 @@ class BaseBacktester(ABC):
         self.config: Dict = config
         self.data: pd.DataFrame = data
         self.pf: vbt.Portfolio | None = None
+        self.results: pd.DataFrame | None = None
+        # config['cache'] = True keeps per-cell metrics on disk, keyed by the input data and config
+        self.cache: ResultCache | None = ResultCache() if config.get('cache') else None
         self.validate_config()
 
     def validate_config(self):
@@ -25,11 +41,27 @@ class BaseBacktester(ABC):
             raise ValueError(f"Backtester is missing data source.")
         if not isinstance(self.data, pd.DataFrame) and not isinstance(self.data, pd.Series):
             raise TypeError(f"Backtester input data is invalid. Must be DataFrame, not {type(self.data)}.")
+        if isinstance(self.data, pd.DataFrame) and {"timestamp", "close"} <= set(self.data.columns):
+            # A candle frame, e.g. from Scraper.get_dataframe(): backtest its close prices
+            self.data = self.close_prices(self.data)
+
+    @staticmethod
+    def close_prices(candles: pd.DataFrame) -> pd.Series:
+        """ Close prices of a candle frame indexed by candle datetime """
+        data = candles[["timestamp", "close"]].copy()
+        data["date"] = pd.to_datetime(pd.to_numeric(data["timestamp"]), unit="s")
+        return pd.to_numeric(data.set_index("date")["close"])
 
     def load_data_from_csv(self, file_path: str):
-        self.data = pd.read_csv(file_path)[["timestamp", "close"]]
-        self.data["date"] = pd.to_datetime(self.data["timestamp"], unit="s")
-        self.data = self.data.set_index("date")["close"]
+        self.data = self.close_prices(pd.read_csv(file_path))
+
+    def load_data_from_store(self, name: str, start: int = None, end: int = None):
+        """ Memory-mapped close prices from the columnar candle store, optionally within [start, end) """
+        self.data = CandleStore(name).load_series("close", start=start, end=end)
+
+    def load_resampled_data(self, currency_pair: str, timeframe: int, start: int = None, end: int = None):
+        """ Close prices of a higher timeframe built from the stored 1m candles, without any network I/O """
+        self.data = Resampler(currency_pair).load_series(timeframe, "close", start=start, end=end)
 
     @abstractmethod
     def run_backtest(self):
@@ -39,72 +71,314 @@ class BaseBacktester(ABC):
     def display_results(self):
         pass
 
+    def result_table(self) -> pd.DataFrame | None:
+        """ Per-cell metrics of the last run """
+        return self.results
+
+    def export_results(self, path: str, top_k: int = None, by: str = None) -> str:
+        """ Write result_table() to .parquet / .json / .csv, optionally only the top_k cells by metric `by` """
+        if self.result_table() is None:
+            raise ValueError("Nothing to export, run the backtest first.")
+        return export_results(self.result_table(), path, top_k=top_k, by=by)
+
+    def report(self):
+        """
+        Called at the end of run_backtest: exports results to config['export'] (a file path, optionally with
+        config['top_k'] / config['top_by']) and displays them unless config['headless'] is set.
+        """
+        if self.config.get('export'):
+            with span("export_results"):
+                self.export_results(
+                    self.config['export'], top_k=self.config.get('top_k'), by=self.config.get('top_by')
+                )
+        if not self.config.get('headless'):
+            with span("display_results"):
+                self.display_results()
+
 
 class SingleStrategyBacktester(BaseBacktester):
     def display_results(self):
         if self.pf is not None:
             print(self.pf.stats())
             self.pf.plot().show()
+        elif self.results is not None:
+            print(self.results)
 
+    @profiled()
     def run_backtest(self):
+        """ Returns the portfolio, or only the metrics in self.results when they were found in the result cache """
         self.validate_data()
-        rsi = vbt.RSI.run(self.data, window=self.config['window'], short_name="rsi")
-
         entry_point = self.config['entry_point']
         exit_point = self.config['exit_point']
+        grid = make_grid([self.config['window']], [entry_point], [exit_point])
+        names = metric_names(self.config)
+        if self.cache is not None:
+            data_hash = series_hash(self.data)
+            cached = {name: self.cache.lookup(data_hash, {**self.config, 'metric': name}, grid) for name in names}
+            if all(len(values) for values in cached.values()):
+                self.pf = None
+                self.results = pd.DataFrame(cached)
+                self.report()
+                return self.results
 
-        entries = rsi.rsi_crossed_below(entry_point)
-        exits = rsi.rsi_crossed_above(exit_point)
+        with span("rsi"):
+            rsi = vbt.RSI.run(self.data, window=self.config['window'], short_name="rsi")
 
-        self.pf = vbt.Portfolio.from_signals(
-            self.data, entries, exits,
-            sl_stop=self.config['stop_loss'],
-            tp_stop=self.config['take_profit'],
-            fees=self.config['fee']
-        )
+        with span("signals"):
+            entries = rsi.rsi_crossed_below(entry_point)
+            exits = rsi.rsi_crossed_above(exit_point)
+
+        with span("portfolio"):
+            self.pf = vbt.Portfolio.from_signals(
+                self.data, entries, exits,
+                sl_stop=self.config['stop_loss'],
+                tp_stop=self.config['take_profit'],
+                fees=self.config['fee']
+            )
+        with span("metrics"):
+            self.results = pd.DataFrame(portfolio_metrics(self.pf, names), index=grid)
+        if self.cache is not None:
+            for name in names:
+                self.cache.put(data_hash, {**self.config, 'metric': name}, self.results[name])
 
-        self.display_results()
+        self.report()
         return self.pf
 
 
+class CombinedStrategyBacktester(BaseBacktester):
+    """
+    RSI levels confirmed by a fast / slow moving average trend: enter while RSI is above 'entry_point' in an uptrend
+    (fast MA above slow MA), exit when RSI drops below 'exit_point' or the uptrend ends.
+    Extra config keys: 'fast_window', 'slow_window'. Windows may be an int or a list / range, the RSI levels a value,
+    a list or a (low, high) tuple split into 'num' points. Every combination with fast_window < slow_window
+    is backtested in one pass, in batches with config['memory_budget'] (MB).
+    """
+
+    def validate_config(self):
+        super().validate_config()
+        if 'fast_window' not in self.config or 'slow_window' not in self.config:
+            raise ValueError("Combined strategy config needs 'fast_window' and 'slow_window'.")
+
+    @profiled()
+    def run_backtest(self):
+        """ Returns the portfolio (one column per combination) without a memory budget, the results otherwise """
+        self.validate_data()
+        grid = make_combined_grid(
+            as_windows(self.config['window']),
+            as_levels(self.config['entry_point'], self.config['num']),
+            as_levels(self.config['exit_point'], self.config['num']),
+            as_windows(self.config['fast_window']),
+            as_windows(self.config['slow_window']),
+        )
+        self.pf, self.results = evaluate_combined(self.data, grid, self.config, self.config.get('memory_budget'))
+        self.report()
+        return self.pf if self.pf is not None else self.results
+
+    def display_results(self):
+        if self.results is None:
+            return
+        if self.pf is not None and len(self.results) == 1:
+            column = self.results.index[0]
+            print(self.pf.stats(column=column))
+            self.pf.plot(column=column).show()
+            return
+
+        metric = self.config['metric']
+        print(self.results[metric].describe())
+        print(self.results.nlargest(10, metric))
+        # Best combination of every MA pair
+        best = self.results[metric].groupby(level=["fast_window", "slow_window"]).max()
+        best.vbt.heatmap(
+            x_level="fast_window", y_level="slow_window", xaxis_title="fast MA", yaxis_title="slow MA"
+        ).show()
+
+
 class GridBacktester(BaseBacktester):
+    @profiled()
     def run_backtest(self):
-        """ Backtest a grid of strategies """
+        """
+        Backtest a grid of strategies. config['window'] may be a list / range to grid-search the window too:
+        RSI is then computed once per window and windows are evaluated in parallel
+        (config['n_jobs'], default all cores).
+        Metrics of every cell end up in self.results, indexed by (rsi_window, rsi_crossed_below, rsi_crossed_above):
+        config['metric'] plus the optional list config['metrics'] (e.g. 'total_trades', 'win_rate', 'max_drawdown',
+        'sharpe_ratio'), all read from the same simulation, see metric_matrices().
+        config['memory_budget'] (MB) evaluates the grid in batches of cells instead of one portfolio for all of them.
+        config['engine'] = 'kernel' computes the metric with the compiled kernel instead of vbt portfolios
+        (metrics: backtesting.kernels.KERNEL_METRICS).
+        config['cache'] = True only computes the cells missing from the result cache.
+        config['budget'] evaluates at most that many cells, coarse to fine around the best ones
+        (see backtesting.search), instead of the full grid: self.results then only holds the evaluated cells.
+        Returns the portfolio for a single window with the default engine, no memory budget, no cache
+        and no budget, the results otherwise.
+        """
         self.validate_data()
-        rsi = vbt.RSI.run(self.data, window=self.config['window'], short_name="rsi")
+        windows, entry_points, exit_points = self.grid_axes()
+
+        if self.config.get('budget'):
+            self.pf = None
+            self.results = adaptive_search(
+                self.data, windows, entry_points, exit_points, self.config, self.config['budget'],
+                self.config.get('n_jobs'), self.cache
+            )
+            self.report()
+            return self.results
+
+        if self.cache is not None:
+            self.pf = None
+            self.results = evaluate_grid_cached(
+                self.data, make_grid(windows, entry_points, exit_points), self.config, self.cache,
+                self.config.get('n_jobs')
+            )
+            self.report()
+            return self.results
+
+        if len(windows) > 1 or self.config.get('memory_budget') or self.config.get('engine') == 'kernel':
+            self.pf = None
+            self.results = evaluate_grid(
+                self.data, make_grid(windows, entry_points, exit_points), self.config, self.config.get('n_jobs')
+            )
+            self.report()
+            return self.results
 
+        cells = np.array(np.meshgrid(entry_points, exit_points)).T.reshape(-1, 2)
+        self.results, self.pf = evaluate_window(self.data, windows[0], cells, self.config, return_portfolio=True)
+
+        self.report()
+        return self.pf
+
+    def grid_axes(self) -> tuple[list[int], np.ndarray, np.ndarray]:
+        """ RSI windows, entry points and exit points spanned by the config """
+        windows = as_windows(self.config['window'])
         entry_points = np.linspace(self.config['entry_point'][0], self.config['entry_point'][1], num=self.config['num'])
         exit_points = np.linspace(self.config['exit_point'][0], self.config['exit_point'][1], num=self.config['num'])
+        return windows, entry_points, exit_points
 
-        grid = np.array(np.meshgrid(entry_points, exit_points)).T.reshape(-1, 2)
-        entries = rsi.rsi_crossed_below(grid[:, 0])
-        exits = rsi.rsi_crossed_above(grid[:, 1])
+    def metric_matrix(self, name: str = None, window: int = None) -> pd.DataFrame:
+        """ A per-cell metric (default config['metric']) of one window (default the first) as exit x entry matrix """
+        values = self.results[name or self.config['metric']]
+        window = values.index.get_level_values("rsi_window")[0] if window is None else window
+        return values.xs(window, level="rsi_window").unstack("rsi_crossed_below")
 
-        self.pf = vbt.Portfolio.from_signals(
-            self.data, entries, exits,
-            sl_stop=self.config['stop_loss'],
-            tp_stop=self.config['take_profit'],
-            fees=self.config['fee']
-        )
+    def metric_matrices(self, names: list[str] = None, window: int = None) -> dict[str, pd.DataFrame]:
+        """ Aligned matrices of several per-cell metrics (default all computed ones) from the same grid run """
+        return {name: self.metric_matrix(name, window) for name in names or self.results.columns}
 
-        self.display_results()
-        return self.pf
+    def hover_text(self, window: int = None) -> np.ndarray:
+        """ Every computed metric of every cell, laid out like metric_matrix() """
+        text = None
+        for name, matrix in self.metric_matrices(window=window).items():
+            lines = matrix.map(lambda value, label=name: f"{label}: {value:.4g}")
+            text = lines if text is None else text + "<br>" + lines
+        return text.to_numpy()
 
     def display_results(self):
+        if self.results is None:
+            return
         if self.pf is not None:
             print(self.pf.stats(agg_func=None))
-            # Output performance matrix
-            pf_perf = self.pf.deep_getattr(self.config['metric'])
-            pf_perf_matrix = pf_perf.vbt.unstack_to_df(
-                index_levels="rsi_crossed_above", column_levels="rsi_crossed_below"
-            )
-            pf_perf_matrix.vbt.heatmap(xaxis_title="entry", yaxis_title="exit").show()
+        metric = self.config['metric']
+        if self.results.index.get_level_values("rsi_window").nunique() == 1:
+            # Performance matrix, hovering a cell shows all of its metrics
+            self.metric_matrix(metric).vbt.heatmap(
+                xaxis_title="entry", yaxis_title="exit",
+                trace_kwargs=dict(text=self.hover_text(), hovertemplate="%{text}<extra></extra>")
+            ).show()
+        else:
+            print(self.results[metric].groupby(level="rsi_window").describe())
+            # One heatmap per window behind a slider
+            self.results[metric].vbt.heatmap(
+                x_level="rsi_crossed_below", y_level="rsi_crossed_above", slider_level="rsi_window",
+                xaxis_title="entry", yaxis_title="exit"
+            ).show()
+
+
+class WalkForwardBacktester(GridBacktester):
+    """
+    Out-of-sample check of the grid: the best cell of every train fold is traded on the test fold right after it.
+    Extra config keys: 'train_size' and 'test_size' (rows), 'anchored' (train from the first row instead of a
+    rolling window, default False), 'n_jobs' (parallel folds).
+    """
+
+    def __init__(self, config: Dict[str, Any], data: pd.DataFrame = None):
+        super().__init__(config, data)
+        self.folds: pd.DataFrame | None = None
+        self.equity: pd.Series | None = None
+
+    def validate_config(self):
+        super().validate_config()
+        if 'train_size' not in self.config or 'test_size' not in self.config:
+            raise ValueError("Walk-forward config needs 'train_size' and 'test_size'.")
+
+    @profiled()
+    def run_backtest(self):
+        """ Per-fold choices in self.folds, returns the stitched out-of-sample equity """
+        self.validate_data()
+        windows, entry_points, exit_points = self.grid_axes()
+        self.folds, self.equity = walk_forward(
+            self.data, make_grid(windows, entry_points, exit_points), self.config, self.config.get('n_jobs')
+        )
+        self.report()
+        return self.equity
+
+    def result_table(self) -> pd.DataFrame | None:
+        return self.folds
+
+    def display_results(self):
+        if self.folds is not None:
+            print(self.folds.to_string())
+            print(f"Out-of-sample total return: {self.equity.iloc[-1] / INIT_CASH - 1:.4f}")
+            self.equity.vbt.plot().show()
+
+
+class MultiAssetBacktester(GridBacktester):
+    """
+    The RSI grid over many assets at once. data is a wide DataFrame (one close column per asset)
+    or a dict of close Series, which may cover different periods or have gaps.
+    """
+
+    def validate_data(self):
+        if self.data is None:
+            raise ValueError(f"Backtester is missing data source.")
+        self.data = as_wide(self.data)
+
+    def load_data_from_stores(self, currency_pairs: list[str], interval: int = 60, start: int = None, end: int = None):
+        """ Close prices of every <pair>_<interval> candle store, e.g. filled by BatchScraper.scrape_to_store """
+        self.data = {
+            pair: CandleStore(f"{pair}_{interval}").load_series("close", start=start, end=end)
+            for pair in currency_pairs
+        }
+
+    @profiled()
+    def run_backtest(self):
+        """ Metrics indexed by (asset, rsi_window, rsi_crossed_below, rsi_crossed_above) """
+        self.validate_data()
+        windows, entry_points, exit_points = self.grid_axes()
+        self.pf = None
+        self.results = evaluate_assets(
+            self.data, make_grid(windows, entry_points, exit_points), self.config, self.config.get('n_jobs')
+        )
+        self.report()
+        return self.results
+
+    def display_results(self):
+        if self.results is not None:
+            metric = self.config['metric']
+            per_asset = self.results[metric].groupby(level=ASSET_LEVEL)
+            best = per_asset.idxmax().dropna().map(lambda cell: cell[1:])
+            print(pd.concat([per_asset.describe(), best.rename("best_cell")], axis=1))
+            # Average over assets, one heatmap per window
+            mean = self.results[metric].groupby(level=["rsi_window", "rsi_crossed_below", "rsi_crossed_above"]).mean()
+            mean.vbt.heatmap(
+                x_level="rsi_crossed_below", y_level="rsi_crossed_above", slider_level="rsi_window",
+                xaxis_title="entry", yaxis_title="exit"
+            ).show()
 
 
 def main():
     scraper = Scraper(currency_pair="btcusdt")
     scraper.set_time_range(range_size=30)
-    scraper.scrape(interval=60)
+    scraper.scrape(interval=60, use_cache=True)
     data = scraper.get_dataframe()
 
     # For a single strategy backtest:
@@ -135,6 +409,54 @@ def main():
     backtester_grid = GridBacktester(config=backtester_config, data=data)
     grid_pf = backtester_grid.run_backtest()
 
+    # For a grid backtest over windows as well:
+    backtester_config['window'] = range(50, 201, 25)
+    backtester_config['engine'] = 'kernel'  # No portfolio objects, metrics straight from the compiled kernel
+    backtester_windows = GridBacktester(config=backtester_config, data=data)
+    window_results = backtester_windows.run_backtest()
+
+    # For a fine grid at a fixed cost: 500 of the 15 x 200 x 200 cells, refined around the best ones
+    fine_config = {**backtester_config, 'window': range(20, 301, 20), 'num': 200, 'budget': 500}
+    backtester_fine = GridBacktester(config=fine_config, data=data)
+    fine_results = backtester_fine.run_backtest()
+
+    # For walk-forward optimization: one week of 1m candles to train, the next day to test
+    backtester_config['train_size'] = 7 * 1440
+    backtester_config['test_size'] = 1440
+    backtester_walk_forward = WalkForwardBacktester(config=backtester_config, data=data)
+    walk_forward_equity = backtester_walk_forward.run_backtest()
+
+    # For RSI confirmed by a moving average trend, every combination in one pass:
+    combined_config = {
+        'window': [50, 100],
+        'entry_point': (55, 70),  # Enter while RSI is above (and fast MA is above slow MA)
+        'exit_point': (30, 45),  # Exit once RSI drops below
+        'fast_window': [10, 20],
+        'slow_window': range(50, 201, 50),
+        'num': 4,
+        'fee': 0.001,
+        'stop_loss': 5,
+        'take_profit': 10,
+        'metric': 'total_return',
+    }
+    backtester_combined = CombinedStrategyBacktester(config=combined_config, data=data)
+    combined_pf = backtester_combined.run_backtest()
+
+    # For many pairs at once, from the candle stores BatchScraper.scrape_to_store fills:
+    backtester_assets = MultiAssetBacktester(config=backtester_config)
+    backtester_assets.load_data_from_stores(["btcusd", "ethusd", "ltcusd"], interval=60)
+    asset_results = backtester_assets.run_backtest()
+
+    # For batch jobs: no plots, only the 20 best cells written to a file
+    headless_config = {
+        **backtester_config,
+        'headless': True,
+        'export': os.path.join(settings.DATA_DIR, "results", "grid_top.json"),
+        'top_k': 20,
+    }
+    backtester_headless = GridBacktester(config=headless_config, data=data)
+    headless_results = backtester_headless.run_backtest()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,94 @@
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+from backtesting.grid import batch_size, metric_names, portfolio_metrics
+from profiling import profiled, span
+
+COMBINED_LEVELS = ["rsi_window", "rsi_entry", "rsi_exit", "fast_window", "slow_window"]
+
+
+def as_levels(value, num: int) -> list:
+    """ A scalar, a (low, high) tuple split into num points like the grid thresholds, or an explicit list / range """
+    if isinstance(value, tuple) and len(value) == 2:
+        return list(np.linspace(value[0], value[1], num=num))
+    if isinstance(value, (list, range, np.ndarray, pd.Index)):
+        if not len(value):
+            raise ValueError("Parameter ranges must hold at least one value.")
+        return list(value)
+    return [value]
+
+
+def make_combined_grid(rsi_windows: list, entry_levels: list, exit_levels: list, fast_windows: list,
+                       slow_windows: list) -> pd.MultiIndex:
+    """ Every parameter combination with a fast MA shorter than the slow one """
+    product = pd.MultiIndex.from_product(
+        [rsi_windows, entry_levels, exit_levels, fast_windows, slow_windows], names=COMBINED_LEVELS
+    )
+    grid = product[product.get_level_values("fast_window") < product.get_level_values("slow_window")]
+    if grid.empty:
+        raise ValueError("No parameter combination has fast_window < slow_window.")
+    return grid
+
+
+def combined_signals(rsi: np.ndarray, fast_ma: np.ndarray, slow_ma: np.ndarray, entry_levels: np.ndarray,
+                     exit_levels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Entries / exits of shape (rows, cells) from per-cell indicator columns and thresholds, as boolean array logic:
+    enter while RSI is above the entry level and the fast MA is above the slow one,
+    exit once RSI falls below the exit level or the trend is lost. NaN (warm-up) never enters.
+    """
+    trend = fast_ma > slow_ma
+    entries = (rsi > entry_levels[None, :]) & trend
+    exits = ((rsi < exit_levels[None, :]) | ~trend) & ~entries
+    return entries, exits
+
+
+@profiled()
+def evaluate_combined(close: pd.Series, grid: pd.MultiIndex, config: Dict[str, Any],
+                      memory_budget: float = None) -> tuple[vbt.Portfolio | None, pd.DataFrame]:
+    """
+    Metrics of every grid cell in one pass: RSI and MA are computed once per distinct window, the signals of all
+    cells are broadcast into one portfolio (or one per batch of cells with a memory_budget, MB).
+    Returns the portfolio when all cells fit in one batch, and the per-cell metrics.
+    """
+    names = metric_names(config)
+    cells = grid.to_frame(index=False).to_numpy(dtype="float64")
+    rsi_windows = np.unique(cells[:, 0]).astype(int)
+    ma_windows = np.unique(cells[:, 3:]).astype(int)
+    with span("indicators"):
+        rsi = vbt.RSI.run(close, window=list(rsi_windows), short_name="rsi").rsi.to_numpy().reshape(len(close), -1)
+        ma = vbt.MA.run(close, window=list(ma_windows), short_name="ma").ma.to_numpy().reshape(len(close), -1)
+    rsi_column = np.searchsorted(rsi_windows, cells[:, 0])
+    fast_column = np.searchsorted(ma_windows, cells[:, 3])
+    slow_column = np.searchsorted(ma_windows, cells[:, 4])
+
+    size = batch_size(len(close), memory_budget) or len(cells)
+    values = {name: np.empty(len(cells), dtype="float64") for name in names}
+    pf = None
+    for lo in range(0, len(cells), size):
+        batch = slice(lo, lo + size)
+        with span("signals"):
+            entries, exits = combined_signals(
+                rsi[:, rsi_column[batch]], ma[:, fast_column[batch]], ma[:, slow_column[batch]],
+                cells[batch, 1], cells[batch, 2]
+            )
+        with span("portfolio"):
+            pf = vbt.Portfolio.from_signals(
+                close,
+                pd.DataFrame(entries, index=close.index, columns=grid[batch]),
+                pd.DataFrame(exits, index=close.index, columns=grid[batch]),
+                sl_stop=config['stop_loss'],
+                tp_stop=config['take_profit'],
+                fees=config['fee']
+            )
+        with span("metrics"):
+            for name, batch_values in portfolio_metrics(pf, names).items():
+                values[name][batch] = batch_values
+        del entries, exits
+        if size < len(cells):
+            pf = None
+
+    return pf, pd.DataFrame(values, index=grid)
@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+
+EXPORT_FORMATS = (".parquet", ".json", ".csv")
+EXPORT_CHUNK_ROWS = 100_000
+
+
+def top_cells(results: pd.DataFrame, k: int, by: str = None) -> pd.DataFrame:
+    """ k cells with the highest metric `by` (default: first column), cells with a NaN metric are dropped """
+    by = by or results.columns[0]
+    if by not in results.columns:
+        raise ValueError(f"Cannot rank by {by}, results have {list(results.columns)}")
+    return results.nlargest(k, by)
+
+
+def export_results(results: pd.DataFrame, path: str, top_k: int = None, by: str = None) -> str:
+    """
+    Write the per-cell metric table (grid levels become columns) to .parquet, .json (one record per line) or .csv,
+    EXPORT_CHUNK_ROWS rows at a time. With top_k only the best cells by metric `by` are kept. Returns the path.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {extension!r}, use one of {EXPORT_FORMATS}")
+    if top_k:
+        results = top_cells(results, top_k, by)
+
+    table = results.reset_index()
+    chunks = (table.iloc[lo:lo + EXPORT_CHUNK_ROWS] for lo in range(0, max(len(table), 1), EXPORT_CHUNK_ROWS))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if extension == ".parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from None
+        schema = pa.Schema.from_pandas(table, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    else:
+        with open(path, "w") as file:
+            for i, chunk in enumerate(chunks):
+                if extension == ".json":
+                    chunk.to_json(file, orient="records", lines=True, date_format="iso", double_precision=15)
+                else:
+                    chunk.to_csv(file, header=i == 0, index=False)
+    print(f"Exported {len(table)} rows to {path}")
+    return path
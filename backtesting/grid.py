@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+from backtesting.kernels import rsi_grid_metrics
+from profiling import profiled, span
+
+GRID_LEVELS = ["rsi_window", "rsi_crossed_below", "rsi_crossed_above"]
+# Measured peak memory of one grid cell per data row: entry / exit masks plus the float64 arrays
+# (cash, assets, value, returns, ...) vbt materializes while computing a metric
+BYTES_PER_CELL_ROW = 64
+# Short per-cell metric names, usable with both engines, for the portfolio attributes they stand for
+METRIC_ALIASES = {"total_trades": "trades.count", "win_rate": "trades.win_rate"}
+
+
+def as_windows(window) -> list[int]:
+    """ config['window'] may be a single int, a list / tuple of ints or a range """
+    if isinstance(window, (int, np.integer)):
+        return [int(window)]
+    windows = [int(w) for w in window]
+    if not windows:
+        raise ValueError("config['window'] must hold at least one window.")
+    return windows
+
+
+def make_grid(windows: list[int], entry_points: np.ndarray, exit_points: np.ndarray) -> pd.MultiIndex:
+    """ Every (window, entry, exit) combination, window-major like the vbt column order """
+    return pd.MultiIndex.from_product([windows, entry_points, exit_points], names=GRID_LEVELS)
+
+
+def metric_names(config: Dict[str, Any]) -> list[str]:
+    """ config['metric'] followed by the extra per-cell metrics of config['metrics'] (optional) """
+    return list(dict.fromkeys([config['metric'], *config.get('metrics', ())]))
+
+
+def portfolio_metrics(pf: vbt.Portfolio, names: list[str]) -> dict[str, np.ndarray]:
+    """ Per-column values of every metric, all read from the same simulated portfolio """
+    return {
+        name: np.asarray(pf.deep_getattr(METRIC_ALIASES.get(name, name)), dtype="float64").reshape(-1)
+        for name in names
+    }
+
+
+def batch_size(rows: int, memory_budget: float = None) -> int | None:
+    """ Number of grid cells evaluated together to stay within memory_budget (MB), None means all at once """
+    if not memory_budget:
+        return None
+    return max(1, int(memory_budget * 2 ** 20 // (rows * BYTES_PER_CELL_ROW)))
+
+
+@profiled()
+def evaluate_window(close: pd.Series, window: int, cells: np.ndarray, config: Dict[str, Any],
+                    memory_budget: float = None, rsi: pd.Series = None,
+                    return_portfolio: bool = False) -> pd.DataFrame | tuple[pd.DataFrame, vbt.Portfolio]:
+    """
+    Metrics (see metric_names) of every (entry, exit) cell for one RSI window. RSI is computed once and shared
+    by all cells, every metric of a cell comes from the same portfolio.
+    cells: array of shape (k, 2) with entry / exit thresholds.
+    With a memory_budget (MB) cells are evaluated in batches and each batch's arrays are released before the next.
+    config['engine'] == 'kernel' skips signals and portfolios altogether, see backtesting.kernels.
+    rsi: precomputed RSI aligned with close (e.g. a slice of a longer series), computed from close if omitted.
+    return_portfolio: also return the portfolio of all cells, its columns labelled like the metrics' index
+    (not with a memory_budget or the kernel engine).
+    """
+    if return_portfolio and (memory_budget or config.get('engine') == 'kernel'):
+        raise ValueError("The portfolio of all cells is only kept without a memory budget and with the vbt engine.")
+    if rsi is None:
+        with span("rsi"):
+            rsi = vbt.RSI.run(close, window=window, short_name="rsi").rsi
+    names = metric_names(config)
+    index = pd.MultiIndex.from_arrays([np.full(len(cells), window), cells[:, 0], cells[:, 1]], names=GRID_LEVELS)
+    if config.get('engine') == 'kernel':
+        with span("kernel"):
+            values = rsi_grid_metrics(close.to_numpy(), rsi.to_numpy(), cells, config, names)
+        return pd.DataFrame(values, index=index, columns=names)
+
+    size = batch_size(len(close), memory_budget) or len(cells)
+    values = {name: np.empty(len(cells), dtype="float64") for name in names}
+    for lo in range(0, len(cells), size):
+        batch = cells[lo:lo + size]
+        with span("signals"):
+            # Thresholds as a row broadcast to one column each
+            entries = rsi.vbt.crossed_below(batch[:, 0][None, :]).values
+            exits = rsi.vbt.crossed_above(batch[:, 1][None, :]).values
+            if return_portfolio:
+                entries = pd.DataFrame(entries, index=close.index, columns=index, copy=False)
+        with span("portfolio"):
+            pf = vbt.Portfolio.from_signals(
+                close, entries, exits,
+                sl_stop=config['stop_loss'],
+                tp_stop=config['take_profit'],
+                fees=config['fee']
+            )
+        with span("metrics"):
+            for name, batch_values in portfolio_metrics(pf, names).items():
+                values[name][lo:lo + size] = batch_values
+        if return_portfolio:
+            return pd.DataFrame(values, index=index), pf
+        del entries, exits, pf
+    return pd.DataFrame(values, index=index)
+
+
+_WORKER_CLOSE: pd.Series | None = None  # Prices held by the workers of a close_pool()
+_WORKER_RSI: dict[int, pd.Series] = {}
+
+
+def _init_worker(close: pd.Series):
+    global _WORKER_CLOSE
+    _WORKER_CLOSE = close
+    _WORKER_RSI.clear()
+
+
+def _evaluate_pooled(window: int, cells: np.ndarray, config: Dict[str, Any], memory_budget: float = None):
+    if window not in _WORKER_RSI:
+        _WORKER_RSI[window] = vbt.RSI.run(_WORKER_CLOSE, window=window, short_name="rsi").rsi
+    return evaluate_window(_WORKER_CLOSE, window, cells, config, memory_budget, rsi=_WORKER_RSI[window])
+
+
+def close_pool(close: pd.Series, n_jobs: int = None) -> ProcessPoolExecutor:
+    """
+    Process pool for several evaluate_grid(close, ..., pool=pool) calls on the same prices: the workers start once,
+    get close once and keep the RSI of every window they computed.
+    """
+    return ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count() or 1, initializer=_init_worker, initargs=(close,))
+
+
+def evaluate_grid(close: pd.Series, grid: pd.MultiIndex, config: Dict[str, Any], n_jobs: int = None,
+                  pool: ProcessPoolExecutor = None) -> pd.DataFrame:
+    """
+    Metrics for an arbitrary set of (window, entry, exit) cells, grouped by window.
+    Windows are fanned out over a process pool when there is more than one of them,
+    config['memory_budget'] (MB, optional) is split evenly between the workers.
+    pool: a close_pool(close) (same close) shared by many calls, instead of a pool started for this one.
+    """
+    cells = grid.to_frame(index=False).to_numpy(dtype="float64")
+    tasks = [
+        (int(window), cells[cells[:, 0] == window][:, 1:])
+        for window in pd.unique(cells[:, 0])
+    ]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    memory_budget = config.get('memory_budget')
+    if n_jobs <= 1:
+        frames = [evaluate_window(close, window, window_cells, config, memory_budget) for window, window_cells in tasks]
+    elif pool is not None:
+        worker_budget = memory_budget / n_jobs if memory_budget else None
+        futures = [
+            pool.submit(_evaluate_pooled, window, window_cells, config, worker_budget)
+            for window, window_cells in tasks
+        ]
+        frames = [future.result() for future in futures]
+    else:
+        worker_budget = memory_budget / n_jobs if memory_budget else None
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                pool.submit(evaluate_window, close, window, window_cells, config, worker_budget)
+                for window, window_cells in tasks
+            ]
+            frames = [future.result() for future in futures]
+    return pd.concat(frames).reindex(grid)
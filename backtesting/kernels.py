@@ -0,0 +1,149 @@
+""" Compiled fast path for RSI-crossover grids: metrics straight from prices, no signal matrices or Portfolio """
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+from numba import njit
+
+KERNEL_METRICS = ("total_return", "max_drawdown", "total_trades", "win_rate", "final_value")
+INIT_CASH = 100.0  # vbt.Portfolio.from_signals default
+
+
+@njit(cache=True)
+def _crossed_above(value: float, threshold: float, was_below: bool, crossed_ago: int):
+    """ One step of vectorbt's crossed_above_1d_nb (wait=0), returns (crossed, was_below, crossed_ago) """
+    if np.isnan(value) or np.isnan(threshold):
+        return False, False, -1
+    if value > threshold:
+        if was_below:
+            crossed_ago += 1
+            return crossed_ago == 0, was_below, crossed_ago
+        return False, was_below, crossed_ago
+    if value == threshold:
+        return False, was_below, -1
+    return False, True, -1
+
+
+@njit(cache=True)
+def _simulate_cell(close, rsi, entry_point, exit_point, sl_stop, tp_stop, fee, init_cash, out):
+    """
+    Long-only all-in / all-out simulation matching Portfolio.from_signals(close, entries, exits, sl_stop, tp_stop, fees)
+    with close-only data: stops are checked from the bar after the entry, hit at the close and take precedence over
+    signals; conflicting entry + exit signals are ignored. Writes KERNEL_METRICS into out.
+    """
+    cash = init_cash
+    position = 0.0
+    entry_price = np.nan
+    entry_cost = 0.0
+    peak = init_cash
+    max_drawdown = 0.0
+    trades = 0
+    wins = 0
+
+    entry_was_below, entry_ago = False, -1
+    exit_was_below, exit_ago = False, -1
+    for i in range(close.shape[0]):
+        price = close[i]
+        # crossed_below(rsi, entry) is crossed_above(entry, rsi)
+        is_entry, entry_was_below, entry_ago = _crossed_above(entry_point, rsi[i], entry_was_below, entry_ago)
+        is_exit, exit_was_below, exit_ago = _crossed_above(rsi[i], exit_point, exit_was_below, exit_ago)
+
+        stopped = False
+        if position > 0:
+            if not np.isnan(sl_stop) and price <= entry_price * (1 - sl_stop):
+                stopped = True
+            elif not np.isnan(tp_stop) and entry_price * (1 + tp_stop) <= price:
+                stopped = True
+
+        if stopped or (is_exit and not is_entry and position > 0):
+            proceeds = position * price
+            cash += proceeds - proceeds * fee
+            if proceeds - proceeds * fee - entry_cost > 0:
+                wins += 1
+            position = 0.0
+            entry_price = np.nan
+        elif is_entry and not is_exit and position == 0 and cash > 0:
+            spend = cash / (1 + fee)
+            position = spend / price
+            entry_cost = cash
+            cash = 0.0
+            entry_price = price
+            trades += 1
+
+        value = cash + position * price
+        if value > peak:
+            peak = value
+        drawdown = value / peak - 1
+        if drawdown < max_drawdown:
+            max_drawdown = drawdown
+
+    final_value = cash + position * close[close.shape[0] - 1]
+    if position > 0 and position * close[close.shape[0] - 1] - entry_cost > 0:
+        wins += 1  # Like vbt, an open trade counts with its PnL at the last close
+    out[0] = final_value / init_cash - 1
+    out[1] = max_drawdown
+    out[2] = trades
+    out[3] = wins / trades if trades > 0 else np.nan
+    out[4] = final_value
+
+
+@njit(cache=True)
+def rsi_grid_metrics_nb(close, rsi, entry_points, exit_points, sl_stop, tp_stop, fee, init_cash):
+    """
+    KERNEL_METRICS for every (entry_points[k], exit_points[k]) cell.
+    Single-threaded on purpose: callers parallelize with fork-based process pools, which numba's threading layers
+    do not survive (the interpreter hangs at exit once both ran in one process).
+    """
+    out = np.empty((entry_points.shape[0], len(KERNEL_METRICS)), dtype=np.float64)
+    for k in range(entry_points.shape[0]):
+        _simulate_cell(close, rsi, entry_points[k], exit_points[k], sl_stop, tp_stop, fee, init_cash, out[k])
+    return out
+
+
+def rsi_grid_metrics(close: np.ndarray, rsi: np.ndarray, cells: np.ndarray, config: Dict[str, Any],
+                     metrics: list[str]) -> np.ndarray:
+    """ Requested metrics (columns) for (entry, exit) cells (rows) """
+    unknown = [metric for metric in metrics if metric not in KERNEL_METRICS]
+    if unknown:
+        raise ValueError(f"Kernel engine does not compute {unknown}, available metrics: {KERNEL_METRICS}")
+
+    def stop(value) -> float:
+        return np.nan if value is None else float(value)
+
+    out = rsi_grid_metrics_nb(
+        np.ascontiguousarray(close, dtype=np.float64),
+        np.ascontiguousarray(rsi, dtype=np.float64),
+        np.ascontiguousarray(cells[:, 0], dtype=np.float64),
+        np.ascontiguousarray(cells[:, 1], dtype=np.float64),
+        stop(config['stop_loss']),
+        stop(config['take_profit']),
+        float(config['fee']),
+        INIT_CASH,
+    )
+    return out[:, [KERNEL_METRICS.index(metric) for metric in metrics]]
+
+
+def check_parity(close: pd.Series, window: int, cells: np.ndarray, config: Dict[str, Any]) -> pd.DataFrame:
+    """ Kernel metrics next to Portfolio.from_signals metrics for the same cells, with the largest abs difference """
+    rsi = vbt.RSI.run(close, window=window, short_name="rsi")
+    pf = vbt.Portfolio.from_signals(
+        close,
+        rsi.rsi_crossed_below(cells[:, 0].tolist()).values,
+        rsi.rsi_crossed_above(cells[:, 1].tolist()).values,
+        sl_stop=config['stop_loss'],
+        tp_stop=config['take_profit'],
+        fees=config['fee']
+    )
+    expected = np.column_stack([
+        np.asarray(pf.total_return()),
+        np.asarray(pf.max_drawdown()),
+        np.asarray(pf.trades.count()),
+        np.asarray(pf.trades.win_rate()),
+        np.asarray(pf.final_value()),
+    ])
+    actual = rsi_grid_metrics(close.to_numpy(), rsi.rsi.to_numpy(), cells, config, list(KERNEL_METRICS))
+    report = pd.DataFrame(np.abs(actual - expected), columns=list(KERNEL_METRICS))
+    # NaN win rates on both sides (no trades) count as equal
+    report[np.isnan(actual) & np.isnan(expected)] = 0.0
+    return report.max().to_frame("max_abs_diff")
@@ -0,0 +1,124 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+from backtesting.grid import GRID_LEVELS, batch_size, metric_names, portfolio_metrics
+from backtesting.kernels import rsi_grid_metrics
+from profiling import profiled
+
+ASSET_LEVEL = "asset"
+
+
+def as_wide(data: pd.DataFrame | pd.Series | dict[str, pd.Series]) -> pd.DataFrame:
+    """ Close prices as one column per asset on the union of all timestamps, NaN where an asset has no candle """
+    if isinstance(data, dict):
+        data = pd.concat(data, axis=1)
+    elif isinstance(data, pd.Series):
+        data = data.to_frame()
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError(f"Multi-asset data must be a DataFrame or a dict of Series, not {type(data)}.")
+    if data.index.has_duplicates:
+        raise ValueError("Multi-asset data has duplicated timestamps.")
+    return data.sort_index().rename_axis(columns=ASSET_LEVEL)
+
+
+def group_assets(wide: pd.DataFrame) -> list[tuple[np.ndarray, list]]:
+    """ Assets observed on exactly the same rows, with that row mask. Assets without any rows are left out. """
+    valid = wide.notna().to_numpy()
+    groups = {}
+    for column, asset in enumerate(wide.columns):
+        if valid[:, column].any():
+            groups.setdefault(valid[:, column].tobytes(), []).append(asset)
+    return [(np.frombuffer(mask, dtype=bool), assets) for mask, assets in groups.items()]
+
+
+@profiled()
+def evaluate_group(close: pd.DataFrame, window: int, cells: np.ndarray, config: Dict[str, Any],
+                   memory_budget: float = None) -> pd.DataFrame:
+    """
+    Metrics of every (asset, entry, exit) for assets sharing the same rows (close has no NaN), in one vbt pass:
+    RSI of all assets at once, then (asset, cell) columns broadcast into a single portfolio,
+    in batches of columns with a memory_budget (MB).
+    """
+    names = metric_names(config)
+    rsi = vbt.RSI.run(close, window=window, short_name="rsi").rsi.to_numpy()
+    prices = close.to_numpy(dtype="float64")
+    n_assets, n_cells = prices.shape[1], len(cells)
+
+    if config.get('engine') == 'kernel':
+        values = np.concatenate([
+            rsi_grid_metrics(prices[:, asset], rsi[:, asset], cells, config, names) for asset in range(n_assets)
+        ])
+    else:
+        # Column c is asset c // n_cells with cell c % n_cells
+        total = n_assets * n_cells
+        size = batch_size(len(close), memory_budget) or total
+        values = np.empty((total, len(names)), dtype="float64")
+        for lo in range(0, total, size):
+            assets, cell_ids = np.divmod(np.arange(lo, min(lo + size, total)), n_cells)
+            batch_rsi = pd.DataFrame(rsi[:, assets], index=close.index)
+            entries = batch_rsi.vbt.crossed_below(cells[cell_ids, 0][None, :]).values
+            exits = batch_rsi.vbt.crossed_above(cells[cell_ids, 1][None, :]).values
+            pf = vbt.Portfolio.from_signals(
+                pd.DataFrame(prices[:, assets], index=close.index), entries, exits,
+                sl_stop=config['stop_loss'],
+                tp_stop=config['take_profit'],
+                fees=config['fee']
+            )
+            values[lo:lo + size] = np.column_stack(list(portfolio_metrics(pf, names).values()))
+            del batch_rsi, entries, exits, pf
+
+    index = pd.MultiIndex.from_arrays([
+        np.repeat(close.columns.to_numpy(), n_cells),
+        np.full(n_assets * n_cells, window),
+        np.tile(cells[:, 0], n_assets),
+        np.tile(cells[:, 1], n_assets),
+    ], names=[ASSET_LEVEL] + GRID_LEVELS)
+    return pd.DataFrame(values, index=index, columns=names)
+
+
+def evaluate_assets(data: pd.DataFrame | dict[str, pd.Series], grid: pd.MultiIndex, config: Dict[str, Any],
+                    n_jobs: int = None) -> pd.DataFrame:
+    """
+    Grid metrics of many assets, indexed by (asset, rsi_window, rsi_crossed_below, rsi_crossed_above).
+
+    Every asset is evaluated on its own candles only: assets starting later, ending earlier or having gaps
+    get the same results as a separate GridBacktester run on their own series. Assets sharing the same
+    candles are batched into one pass per window, (group, window) tasks are fanned out over a process pool.
+    Assets without any data get NaN.
+    """
+    wide = as_wide(data)
+    cells = grid.to_frame(index=False).to_numpy(dtype="float64")
+    tasks = [
+        (wide.loc[mask, assets], int(window), cells[cells[:, 0] == window][:, 1:])
+        for mask, assets in group_assets(wide)
+        for window in pd.unique(cells[:, 0])
+    ]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    memory_budget = config.get('memory_budget')
+    if n_jobs <= 1:
+        frames = [
+            evaluate_group(close, window, group_cells, config, memory_budget) for close, window, group_cells in tasks
+        ]
+    else:
+        worker_budget = memory_budget / n_jobs if memory_budget else None
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                pool.submit(evaluate_group, close, window, group_cells, config, worker_budget)
+                for close, window, group_cells in tasks
+            ]
+            frames = [future.result() for future in futures]
+
+    assets = wide.columns.to_numpy()
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(assets, len(grid))] + [np.tile(grid.get_level_values(level), len(assets)) for level in GRID_LEVELS],
+        names=[ASSET_LEVEL] + GRID_LEVELS
+    )
+    if not frames:
+        return pd.DataFrame(np.nan, index=index, columns=metric_names(config))
+    return pd.concat(frames).reindex(index)
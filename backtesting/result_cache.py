@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+import settings
+from backtesting.grid import GRID_LEVELS, evaluate_grid, metric_names
+
+RESULTS_DIR = os.path.join(settings.DATA_DIR, "results")
+# Settings every cell shares, the cell itself is (rsi_window, rsi_crossed_below, rsi_crossed_above).
+# The engine is left out on purpose, the kernel matches the vbt portfolios.
+KEY_CONFIG = ['fee', 'stop_loss', 'take_profit', 'metric']
+CELL_DECIMALS = 10  # linspace thresholds of overlapping configs may differ in the last bits
+
+
+def series_hash(data: pd.Series | pd.DataFrame) -> str:
+    """ blake2b over the index and values of the backtester input """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(data.index, index=False).to_numpy())
+    digest.update(np.ascontiguousarray(data.to_numpy(dtype="float64")).view("uint8"))
+    return digest.hexdigest()
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """ Hash of the config keys affecting a cell's metric, numbers normalized so 5 and 5.0 match """
+    def normalize(value):
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+            return None if np.isnan(value) else float(value)
+        return value
+
+    normalized = {key: normalize(config.get(key)) for key in KEY_CONFIG}
+    return hashlib.blake2b(json.dumps(normalized, sort_keys=True).encode(), digest_size=8).hexdigest()
+
+
+def cell_index(cells: np.ndarray) -> pd.MultiIndex:
+    cells = np.round(np.asarray(cells, dtype="float64"), CELL_DECIMALS)
+    return pd.MultiIndex.from_arrays([cells[:, 0], cells[:, 1], cells[:, 2]], names=GRID_LEVELS)
+
+
+class ResultCache:
+    """
+    On-disk cache of per-cell metrics, one .npz file per (input data hash, config hash) holding every cell seen so far.
+    Files are rewritten atomically on every put. Once the cache grows past max_size (MB) the least recently used
+    files are deleted.
+    """
+
+    def __init__(self, path: str = RESULTS_DIR, max_size: float = 256):
+        self.path: str = path
+        self.max_size: float = max_size
+
+    def file_path(self, data_hash: str, config: Dict[str, Any]) -> str:
+        return os.path.join(self.path, f"{data_hash}_{config_hash(config)}.npz")
+
+    def _read(self, path: str) -> pd.Series:
+        if not os.path.isfile(path):
+            return pd.Series(dtype="float64", index=cell_index(np.empty((0, 3))))
+        with np.load(path) as file:
+            return pd.Series(file["values"], index=cell_index(file["cells"]))
+
+    def lookup(self, data_hash: str, config: Dict[str, Any], grid: pd.MultiIndex) -> pd.Series:
+        """ Cached metric of the grid cells found in the cache, indexed by those cells """
+        path = self.file_path(data_hash, config)
+        stored = self._read(path)
+        if stored.empty:
+            return pd.Series(dtype="float64", index=grid[:0], name=config['metric'])
+        os.utime(path)  # Recently used
+
+        keys = cell_index(grid.to_frame(index=False).to_numpy(dtype="float64"))
+        found = keys.isin(stored.index)
+        return pd.Series(stored.reindex(keys[found]).to_numpy(), index=grid[found], name=config['metric'])
+
+    def put(self, data_hash: str, config: Dict[str, Any], results: pd.Series):
+        """ Merge per-cell results (indexed like the grid) into the cache """
+        path = self.file_path(data_hash, config)
+        new = pd.Series(results.to_numpy(), index=cell_index(results.index.to_frame(index=False).to_numpy()))
+        merged = pd.concat([self._read(path), new])
+        merged = merged[~merged.index.duplicated(keep="last")]
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, cells=merged.index.to_frame(index=False).to_numpy(), values=merged.to_numpy())
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def size(self) -> int:
+        """ Bytes on disk """
+        if not os.path.isdir(self.path):
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.name.endswith(".npz"))
+
+    def evict(self, keep: str = None):
+        """ Delete least recently used files until the cache fits max_size, never the keep file """
+        if not os.path.isdir(self.path):
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.path) if entry.name.endswith(".npz")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_size * 2 ** 20:
+                break
+            if entry.path == keep:
+                continue
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+
+def evaluate_grid_cached(close: pd.Series, grid: pd.MultiIndex, config: Dict[str, Any], cache: ResultCache,
+                         n_jobs: int = None, pool: ProcessPoolExecutor = None) -> pd.DataFrame:
+    """
+    evaluate_grid for the cells the cache has not seen for this data and config, the rest is read back.
+    Every metric of metric_names(config) is cached on its own, a cell is only skipped once all of them are cached.
+    """
+    data_hash = series_hash(close)
+    configs = {name: {**config, 'metric': name} for name in metric_names(config)}
+    cached = {name: cache.lookup(data_hash, metric_config, grid) for name, metric_config in configs.items()}
+    complete = np.logical_and.reduce([grid.isin(values.index) for values in cached.values()])
+    missing = grid[~complete]
+    if len(missing):
+        computed = evaluate_grid(close, missing, config, n_jobs, pool)
+        for name, metric_config in configs.items():
+            cache.put(data_hash, metric_config, computed[name])
+            cached[name] = pd.concat([cached[name][~cached[name].index.isin(missing)], computed[name]])
+    print(f"Result cache: {len(grid) - len(missing)} of {len(grid)} cells cached")
+    return pd.DataFrame({name: values.reindex(grid) for name, values in cached.items()})
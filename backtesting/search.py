@@ -0,0 +1,102 @@
+import os
+from contextlib import nullcontext
+from itertools import product
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from backtesting.grid import GRID_LEVELS, close_pool, evaluate_grid
+from backtesting.result_cache import ResultCache, evaluate_grid_cached
+from profiling import profiled
+
+SEARCH_KEEP = 3  # Best cells refined around in every round
+# Moves to the 26 surrounding lattice points (and the point itself, filtered out as already evaluated)
+NEIGHBOUR_OFFSETS = np.array(list(product((-1, 0, 1), repeat=len(GRID_LEVELS))))
+
+
+def lattice_axis(size: int, stride: int) -> np.ndarray:
+    """ Every stride-th position of an axis, always including both ends """
+    return np.unique(np.r_[np.arange(0, size, stride), size - 1])
+
+
+def coarse_stride(shape: tuple[int, ...], budget: int) -> int:
+    """ Smallest power of two stride whose lattice takes at most half the budget, the rest is left for refining """
+    stride = 1
+    while np.prod([len(lattice_axis(size, stride)) for size in shape]) > budget // 2 and stride < max(shape):
+        stride *= 2
+    return stride
+
+
+@profiled()
+def adaptive_search(close: pd.Series, windows: list[int], entry_points: np.ndarray, exit_points: np.ndarray,
+                    config: Dict[str, Any], budget: int, n_jobs: int = None, cache: ResultCache = None) -> pd.DataFrame:
+    """
+    Coarse-to-fine search of the (window, entry, exit) grid evaluating at most `budget` cells.
+
+    A lattice of every stride-th cell on each axis is evaluated first. Then the neighbourhood (stride apart on every
+    axis) of the config['search_keep'] best cells by config['metric'] is evaluated, again and again while that turns
+    up new cells, halving the stride once it does not, down to adjacent cells. Budget left after that is spent
+    the same way around twice as many of the best cells.
+    Results have the same structure as a full grid run (see evaluate_grid), holding only the evaluated cells.
+    With n_jobs > 1 all rounds share one process pool, its workers get close once and keep their RSI per window.
+    """
+    axes = [np.sort(np.asarray(windows)), np.sort(entry_points), np.sort(exit_points)]
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape))
+    minimum = int(np.prod([len(lattice_axis(size, max(shape))) for size in shape]))
+    if budget < minimum:
+        raise ValueError(f"Search budget of {budget} cells is below the {minimum} corner cells of the grid.")
+    keep = config.get('search_keep', SEARCH_KEEP)
+    metric = config['metric']
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    def evaluate(positions: np.ndarray) -> pd.DataFrame:
+        cells = pd.MultiIndex.from_arrays(
+            [axis[positions[:, level]] for level, axis in enumerate(axes)], names=GRID_LEVELS
+        )
+        if cache is not None:
+            return evaluate_grid_cached(close, cells, config, cache, n_jobs, pool)
+        return evaluate_grid(close, cells, config, n_jobs, pool)
+
+    with close_pool(close, n_jobs) if n_jobs > 1 and len(axes[0]) > 1 else nullcontext() as pool:
+        stride = 1 if budget >= total else coarse_stride(shape, budget)
+        positions = np.array(list(product(*(lattice_axis(size, stride) for size in shape))))
+        frames = [evaluate(positions)]
+        scores = frames[0][metric].to_numpy()
+        seen = np.zeros(shape, dtype=bool)
+        seen[tuple(positions.T)] = True
+
+        refine_stride = stride = max(1, stride // 2)
+        while len(positions) < budget:
+            best = positions[np.argsort(-np.nan_to_num(scores, nan=-np.inf), kind="stable")[:keep]]
+            candidates = np.clip(
+                (best[:, None, :] + NEIGHBOUR_OFFSETS[None, :, :] * stride).reshape(-1, len(shape)),
+                0, np.array(shape) - 1
+            )
+            # Unique in order of appearance, so neighbours of the best cell come first when the budget runs out
+            _, first = np.unique(candidates, axis=0, return_index=True)
+            candidates = candidates[np.sort(first)]
+            candidates = candidates[~seen[tuple(candidates.T)]][:budget - len(positions)]
+            if not len(candidates):
+                if stride > 1:
+                    stride //= 2
+                elif keep < len(positions):
+                    # Converged with budget left: refine around twice as many of the best cells
+                    keep, stride = keep * 2, refine_stride
+                else:
+                    break
+                continue
+
+            frames.append(evaluate(candidates))
+            seen[tuple(candidates.T)] = True
+            positions = np.concatenate([positions, candidates])
+            scores = np.concatenate([scores, frames[-1][metric].to_numpy()])
+
+    results = pd.concat(frames).sort_index()
+    if results[metric].notna().any():
+        best_cell = results[metric].idxmax()
+        print(f"Adaptive search: {len(results)} of {total} cells evaluated, "
+              f"best {metric} {results[metric].max():.4g} at {best_cell}")
+    return results
@@ -0,0 +1,112 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+from backtesting.grid import GRID_LEVELS, METRIC_ALIASES, evaluate_window
+from backtesting.kernels import INIT_CASH
+from profiling import profiled
+
+
+def make_folds(rows: int, train_size: int, test_size: int, anchored: bool = False) -> list[tuple[slice, slice]]:
+    """
+    (train, test) row slices stepping forward by test_size. Rolling folds train on the train_size rows right before
+    the test fold, anchored folds on everything before it. The last test fold may be shorter.
+    """
+    if train_size <= 0 or test_size <= 0:
+        raise ValueError(f"Train and test sizes must be positive, got {train_size} and {test_size}")
+    if rows <= train_size:
+        raise ValueError(f"Not enough data for walk-forward: {rows} rows, train size {train_size}")
+    return [
+        (slice(0 if anchored else start - train_size, start), slice(start, min(start + test_size, rows)))
+        for start in range(train_size, rows, test_size)
+    ]
+
+
+@profiled()
+def run_fold(close: pd.Series, rsi: dict[int, pd.Series], split: int, grid: pd.MultiIndex,
+             config: Dict[str, Any], memory_budget: float = None) -> dict:
+    """
+    Pick the cell with the highest config['metric'] on the rows before split (train), then trade it on the rest (test).
+    rsi holds the RSI of every window for the same rows, sliced from a series computed once over all data,
+    so no fold has to warm the indicator up again.
+    """
+    metric = config['metric']
+    train_config = {**config, 'metrics': ()}  # Only the metric picking the cell
+    train, test = slice(0, split), slice(split, len(close))
+    cells = grid.to_frame(index=False).to_numpy(dtype="float64")
+    frames = [
+        evaluate_window(close.iloc[train], int(window), cells[cells[:, 0] == window][:, 1:], train_config,
+                        memory_budget, rsi=rsi[int(window)].iloc[train])
+        for window in pd.unique(cells[:, 0])
+    ]
+    scores = pd.concat(frames)[metric].dropna()
+
+    fold = {
+        "train_start": close.index[train.start],
+        "train_end": close.index[train.stop - 1],
+        "test_start": close.index[test.start],
+        "test_end": close.index[test.stop - 1],
+    }
+    if scores.empty:
+        # Nothing to choose from, stay in cash for this test fold
+        fold.update(dict.fromkeys(GRID_LEVELS, np.nan), **{f"train_{metric}": np.nan, f"test_{metric}": np.nan})
+        fold["returns"] = pd.Series(0.0, index=close.index[test])
+        return fold
+
+    best = scores.idxmax()
+    window, entry_point, exit_point = best
+    test_rsi = rsi[int(window)].iloc[test]
+    pf = vbt.Portfolio.from_signals(
+        close.iloc[test],
+        test_rsi.vbt.crossed_below(entry_point),
+        test_rsi.vbt.crossed_above(exit_point),
+        sl_stop=config['stop_loss'],
+        tp_stop=config['take_profit'],
+        fees=config['fee'],
+        init_cash=INIT_CASH
+    )
+    fold.update(zip(GRID_LEVELS, best))
+    fold[f"train_{metric}"] = scores[best]
+    fold[f"test_{metric}"] = pf.deep_getattr(METRIC_ALIASES.get(metric, metric))
+    fold["returns"] = pf.returns()
+    return fold
+
+
+def walk_forward(close: pd.Series, grid: pd.MultiIndex, config: Dict[str, Any],
+                 n_jobs: int = None) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Walk-forward optimization over config['train_size'] / config['test_size'] rows (rolling,
+    or anchored with config['anchored']). Folds run in parallel, sharing one RSI per window.
+
+    Returns the per-fold table (spans, chosen cell, in- and out-of-sample metric) and the out-of-sample equity:
+    test folds stitched together, each starting from the previous fold's final value.
+    A position still open at the end of a test fold is marked to market, the next fold starts in cash.
+    """
+    folds = make_folds(len(close), int(config['train_size']), int(config['test_size']), config.get('anchored', False))
+    windows = pd.unique(grid.get_level_values("rsi_window"))
+    rsi = {int(window): vbt.RSI.run(close, window=int(window), short_name="rsi").rsi for window in windows}
+    # Each fold only gets its own rows
+    spans = [(slice(train.start, test.stop), train.stop - train.start) for train, test in folds]
+    tasks = [
+        (close.iloc[span], {window: values.iloc[span] for window, values in rsi.items()}, split)
+        for span, split in spans
+    ]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(folds))
+    memory_budget = config.get('memory_budget')
+    if n_jobs <= 1:
+        results = [run_fold(*task, grid, config, memory_budget) for task in tasks]
+    else:
+        worker_budget = memory_budget / n_jobs if memory_budget else None
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(run_fold, *task, grid, config, worker_budget) for task in tasks]
+            results = [future.result() for future in futures]
+
+    returns = pd.concat([fold.pop("returns") for fold in results])
+    equity = (1 + returns).cumprod().mul(INIT_CASH).rename("equity")
+    table = pd.DataFrame(results).rename_axis("fold")
+    return table, equity
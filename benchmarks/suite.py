@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable
+
+import numba
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+
+import settings
+from backtesting.backtester import GridBacktester
+from benchmarks.synthetic import api_frame, binance_klines, close_series, synthetic_candles
+from scraping.scraper import Scraper
+
+BENCH_DIR = os.path.join(settings.DATA_DIR, "benchmarks")
+STAGES = ("clean_data", "load_csv", "grid_backtest", "bot_rsi", "bot_rsi_stream")
+ENGINES = {"vbt": None, "kernel": "kernel"}
+MINUTES_PER_DAY = 1440
+BOT_KLINES = 120  # The bot fetches the last 2 hours of 1m klines on every tick
+GRID_CONFIG = {
+    'window': 14,
+    'entry_point': (30, 50),
+    'exit_point': (58, 72),
+    'fee': 0.001,
+    'stop_loss': 5,
+    'take_profit': 10,
+    'metric': 'total_return',
+    'headless': True,
+}
+
+
+def measure(fn: Callable, repeat: int = 3, memory: bool = True) -> dict:
+    """
+    Best and median wall time and best CPU time of fn over `repeat` runs, after one untimed warm-up run
+    (numba compilation, imports, caches). With memory, the warm-up run is traced for the peak allocation.
+    """
+    result = {}
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    else:
+        fn()
+
+    walls, cpus = [], []
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        fn()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    result.update(wall_s=min(walls), wall_median_s=statistics.median(walls), cpu_s=min(cpus))
+    return result
+
+
+def bench_clean_data(candles: dict[str, np.ndarray], **kwargs) -> dict:
+    """ Scraper.clean_data on raw string candles as they come from the API """
+    raw = api_frame(candles)
+    scraper = Scraper()
+    scraper.interval = 60
+    scraper.dates = [int(candles["timestamp"][0]), int(candles["timestamp"][-1]) + scraper.interval]
+
+    def run():
+        scraper.df = raw
+        scraper.clean_data()
+
+    return measure(run, **kwargs)
+
+
+def bench_load_csv(candles: dict[str, np.ndarray], **kwargs) -> dict:
+    """ BaseBacktester.load_data_from_csv on a file written by Scraper.save_to_csv """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "candles.csv")
+        pd.DataFrame(candles).to_csv(path, index=False)
+        backtester = GridBacktester({**GRID_CONFIG, 'num': 1})
+        return measure(lambda: backtester.load_data_from_csv(path), **kwargs)
+
+
+def bench_grid_backtest(candles: dict[str, np.ndarray], num: int, engine: str, memory_budget: float = None,
+                        **kwargs) -> dict:
+    """ Headless GridBacktester.run_backtest over num x num cells """
+    close = close_series(candles)
+    config = {**GRID_CONFIG, 'num': num, 'engine': ENGINES[engine], 'memory_budget': memory_budget}
+    return measure(lambda: GridBacktester(config, close).run_backtest(), **kwargs)
+
+
+def _klines_frame(klines: list[list]) -> pd.DataFrame:
+    """ Binance klines -> time / close price frame, as the bot parsed them before StreamingRSI """
+    klines = [[x[0], float(x[4])] for x in klines]
+    klines = pd.DataFrame(klines, columns=["time", "price"])
+    klines["time"] = pd.to_datetime(klines["time"], unit="ms")
+    return klines
+
+
+def _last_rsi(ta, klines: pd.DataFrame, window: int) -> float:
+    """ ta.rsi over the whole frame, its last value: the batch baseline StreamingRSI is compared to """
+    klines["rsi"] = ta.rsi(close=klines["price"], length=window)
+    return klines["rsi"].iloc[-1]
+
+
+def bench_bot_rsi(**kwargs) -> dict:
+    """ The bot's former get_rsi without the network: parse the fetched klines, RSI of the last one """
+    try:
+        import pandas_ta as ta
+    except ImportError as error:
+        return {"skipped": str(error)}
+    klines = binance_klines(synthetic_candles(BOT_KLINES))
+    return measure(lambda: _last_rsi(ta, _klines_frame(klines), GRID_CONFIG['window']), **kwargs)
+
+
+def bench_bot_rsi_stream(**kwargs) -> dict:
+    """ The bot's get_rsi with the streaming state: one tick feeds the closed and the forming kline """
+    try:
+        from bot.indicators import StreamingRSI
+    except ImportError as error:
+        return {"skipped": str(error)}
+    klines = binance_klines(synthetic_candles(BOT_KLINES))
+    state = StreamingRSI.from_klines(klines[:-1], GRID_CONFIG['window'])
+    return measure(lambda: state.feed(klines[-2:]), **kwargs)
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "vectorbt": vbt.__version__,
+        "numba": numba.__version__,
+    }
+
+
+def run_suite(days: list[float] = (1, 30), grids: list[int] = (10, 30), engines: list[str] = tuple(ENGINES),
+              stages: list[str] = STAGES, repeat: int = 3, memory: bool = True, memory_budget: float = None,
+              seed: int = 0) -> dict:
+    """ Every stage on synthetic 1m candles of every length, results as one JSON-serializable report """
+    results = []
+
+    def record(entry: dict):
+        results.append(entry)
+        details = ", ".join(f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                            for key, value in entry.items())
+        print(details)
+
+    options = {"repeat": repeat, "memory": memory}
+    for length in days:
+        rows = int(length * MINUTES_PER_DAY)
+        candles = synthetic_candles(rows, seed=seed)
+        if "clean_data" in stages:
+            record({"stage": "clean_data", "rows": rows, **bench_clean_data(candles, **options)})
+        if "load_csv" in stages:
+            record({"stage": "load_csv", "rows": rows, **bench_load_csv(candles, **options)})
+        if "grid_backtest" in stages:
+            for num in grids:
+                for engine in engines:
+                    result = bench_grid_backtest(candles, num, engine, memory_budget, **options)
+                    record({"stage": "grid_backtest", "rows": rows, "cells": num * num, "engine": engine, **result})
+    if "bot_rsi" in stages:
+        record({"stage": "bot_rsi", "rows": BOT_KLINES, **bench_bot_rsi(**options)})
+    if "bot_rsi_stream" in stages:
+        record({"stage": "bot_rsi_stream", "rows": 2, **bench_bot_rsi_stream(**options)})
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "parameters": {
+            "days": list(days), "grids": list(grids), "engines": list(engines), "stages": list(stages),
+            "repeat": repeat, "memory": memory, "memory_budget": memory_budget, "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def result_key(entry: dict) -> tuple:
+    return entry["stage"], entry["rows"], entry.get("cells"), entry.get("engine")
+
+
+def compare(old: dict, new: dict) -> list[dict]:
+    """ new / old ratio of the best wall time and the peak memory for every benchmark both reports ran """
+    previous = {result_key(entry): entry for entry in old["results"]}
+    rows = []
+    for entry in new["results"]:
+        before = previous.get(result_key(entry))
+        if before is None or "wall_s" not in before or "wall_s" not in entry:
+            continue
+        row = dict(zip(("stage", "rows", "cells", "engine"), result_key(entry)))
+        row["wall_ratio"] = entry["wall_s"] / before["wall_s"]
+        if "peak_mb" in before and "peak_mb" in entry:
+            row["peak_ratio"] = entry["peak_mb"] / before["peak_mb"] if before["peak_mb"] else np.nan
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the scraping, loading and backtesting paths")
+    parser.add_argument("--days", type=float, nargs="+", default=[1, 30], help="Lengths of 1m data, in days")
+    parser.add_argument("--grid", type=int, nargs="+", default=[10, 30], help="Grid sizes (num x num cells)")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark, the best one is reported")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run measuring peak memory")
+    parser.add_argument("--memory-budget", type=float, default=None, help="GridBacktester memory budget, MB")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Report path, default scraping/data/benchmarks/<time>.json")
+    parser.add_argument("--compare", default=None, help="Earlier report to compare this run with")
+    args = parser.parse_args()
+
+    report = run_suite(args.days, args.grid, args.engines, args.stages, args.repeat, not args.no_memory,
+                       args.memory_budget, args.seed)
+    output = args.output or os.path.join(BENCH_DIR, f"bench_{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Report written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            print(pd.DataFrame(compare(json.load(file), report)).to_string(index=False))
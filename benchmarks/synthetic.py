@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+START = 1672531200  # 2023-01-01 00:00 UTC
+
+
+def synthetic_candles(rows: int, interval: int = 60, start: int = START, seed: int = 0) -> dict[str, np.ndarray]:
+    """ Reproducible random-walk OHLCV candles in the store column layout """
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    wick = np.abs(rng.normal(0, 0.0005, (2, rows)))
+    return {
+        "timestamp": start + interval * np.arange(rows, dtype="int64"),
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + wick[0]),
+        "low": np.minimum(open_, close) * (1 - wick[1]),
+        "close": close,
+        "volume": rng.lognormal(0, 1, rows),
+    }
+
+
+def api_frame(candles: dict[str, np.ndarray]) -> pd.DataFrame:
+    """ Candles the way Scraper.df holds them before cleaning: every value a string, as in the Bitstamp response """
+    return pd.DataFrame({column: values.astype(str) for column, values in candles.items()})
+
+
+def close_series(candles: dict[str, np.ndarray]) -> pd.Series:
+    """ Close prices the way the backtesters take them """
+    index = pd.DatetimeIndex(pd.to_datetime(candles["timestamp"], unit="s"), name="date")
+    return pd.Series(candles["close"], index=index, name="close")
+
+
+def binance_klines(candles: dict[str, np.ndarray], interval: int = 60) -> list[list]:
+    """ Candles as python-binance get_historical_klines returns them (ms times, string prices) """
+    columns = [candles[column] for column in ("timestamp", "open", "high", "low", "close", "volume")]
+    return [
+        [int(ts) * 1000, str(o), str(h), str(l), str(c), str(v), (int(ts) + interval) * 1000 - 1]
+        for ts, o, h, l, c, v in zip(*columns)
+    ]
@@ -1,14 +1,20 @@
+import asyncio
 import os
+import sys
 import time
 import traceback
 from datetime import datetime
 
-import pandas as pd
-import pandas_ta as ta
 from binance.client import Client
 from dotenv import load_dotenv
 
+from indicators import StreamingRSI
+from orders import OrderManager
 from redis_utils import *
+from stream import TESTNET_REST_URL, TESTNET_WS_URL, KlineStream
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repository root
+from profiling import profiled  # noqa: E402
 
 load_dotenv()
 # testnet = True means all the trading is virtual
@@ -19,25 +25,23 @@ asset = variables['asset']
 entry = float(variables['entry'])
 exit = float(variables['exit'])
 window = int(variables['window'])
+rsi_state = StreamingRSI(window)
 
 
+@profiled()
 def fetch_klines(asset):
-    klines = client.get_historical_klines(
-        asset, Client.KLINE_INTERVAL_1MINUTE, "2 hour ago UTC"
+    """ 2 hours of 1m klines to warm up, afterwards only the ones since the last closed kline (the forming one last) """
+    if rsi_state.next_open_time is None:
+        return client.get_historical_klines(asset, Client.KLINE_INTERVAL_1MINUTE, "2 hour ago UTC")
+    return client.get_klines(
+        symbol=asset, interval=Client.KLINE_INTERVAL_1MINUTE, startTime=rsi_state.next_open_time
     )
 
-    klines = [[x[0], float(x[4])] for x in klines]
-    klines = pd.DataFrame(klines, columns=["time", "price"])
-    klines["time"] = pd.to_datetime(klines["time"], unit="ms")
-    return klines
-
 
+@profiled()
 def get_rsi(asset):
-    klines = fetch_klines(asset)
-    # Use tech analysis pandas module
-    klines["rsi"] = ta.rsi(close=klines["price"], length=window)
-    # print(klines["rsi"].iloc[-1])
-    return klines["rsi"].iloc[-1]
+    # RSI state is updated once per closed kline, the forming kline gives the current (provisional) value
+    return rsi_state.feed(fetch_klines(asset))
 
 
 # def create_account():
@@ -89,97 +93,94 @@ def trade_log(symbol, side, price, amount):
         trade_file.write(f"{symbol},{side},{amount},{price}\n")
 
 
-def do_trade(client, asset, side, quantity):
+@profiled()
+async def do_trade(asset, side, quantity):
+    """ Place the order, the fill is logged by on_fill while the signal loop keeps running """
     print("[LOG] Making a trade...")
+    # Flipped before placing, so a fill or failure reported right away is not overwritten
+    set_variable('is_buying', side == "sell")
+    try:
+        await orders.submit(asset, side, quantity)
+    except Exception:
+        set_variable('is_buying', side == "buy")
+        raise
 
-    order = None
-    if side == "buy":
-        order = client.order_market_buy(
-            symbol=asset,
-            quantity=quantity,
-        )
-        set_variable('is_buying', False)
-
-    if side == "sell":
-        order = client.order_market_sell(
-            symbol=asset,
-            quantity=quantity,
-        )
-        set_variable('is_buying', True)
-
-    order_id = order.get("orderId", None)
-
-    if order_id is None:
-        raise Exception(f"Failed to get a valid order, order_id is None. {client=} {asset=} {side=} {quantity=}")
-
-    # Until the order is fulfilled refresh it every second
-    while order["status"] != "FILLED":
-        order = client.get_order(
-            symbol=asset,
-            orderId=order_id,
-        )
-        time.sleep(1)
 
+def on_fill(order):
     print("Made order: ")
-    print(order)
-
-    # This list comprehension takes each separate part of buy, multiplies price by quantity
-    # and then sums it up to get the total price
-    price_paid = sum(
-        [float(fill["price"]) * float(fill["qty"]) for fill in order["fills"]]
+    print(order.order)
+    # Total price paid / received over all partial fills
+    trade_log(order.symbol, order.side, order.quote, order.executed)
+
+
+def on_done(order):
+    log(f"[ERR] Order #{order.order_id} {order.side} {order.symbol} ended {order.status}")
+    if order.executed:
+        trade_log(order.symbol, order.side, order.quote, order.executed)
+    elif order.replaced_by is None:
+        # Nothing was traded, look for the same signal again
+        set_variable('is_buying', order.side == "buy")
+
+
+orders = OrderManager(client, on_fill=on_fill, on_done=on_done)
+
+
+def trade_step(old_rsi, rsi):
+    """ Side to trade on an RSI crossover between two consecutive RSI values, None without one """
+    # if not os.path.exists("bot_account.json"):
+    #     create_account()
+    #
+    # with open("bot_account.json") as f:
+    #     account = json.load(f)
+    is_buying = get_variable('is_buying')
+    side = None
+
+    if is_buying:
+        # If crossover up-to-down ▼
+        if rsi < entry < old_rsi:
+            # trade buy
+            side = "buy"
+
+    else:
+        # If crossover bottom-up ▲
+        if rsi > exit > old_rsi:
+            # trade sell
+            side = "sell"
+
+    print(
+        f"[INFO] current rsi = {round(rsi, 3)} | {time.strftime('%y.%m.%d %H:%M:%S', time.localtime())}"
     )
+    return side
 
-    # Log trade
-    trade_log(asset, side, price_paid, quantity)
-
-    # print("[LOG] ... trade is over and logged")
-
-
-def main():
-    rsi = get_rsi(asset)
-
-    # Main working loop
-    while True:
-        current_time = time.localtime()
-        seconds = current_time.tm_sec
 
-        # If seconds are not 00 wait 1 sec and go to the next iteration
-        # if seconds != 0:
-        #     time.sleep(1)
-        #     continue
+async def run_stream():
+    # Warm up the RSI state over REST once, then react to every kline update the websocket pushes
+    last = {"rsi": get_rsi(asset)}
 
+    async def on_kline(kline, closed):
         try:
-            # if not os.path.exists("bot_account.json"):
-            #     create_account()
-            #
-            # with open("bot_account.json") as f:
-            #     account = json.load(f)
-            is_buying = get_variable('is_buying')
-
-            old_rsi = rsi
-            rsi = get_rsi(asset)
-
-            if is_buying:
-                # If crossover up-to-down ▼
-                if rsi < entry < old_rsi:
-                    # trade buy
-                    do_trade(client, asset, "buy", 0.01)
-
-            else:
-                # If crossover bottom-up ▲
-                if rsi > exit > old_rsi:
-                    # trade sell
-                    do_trade(client, asset, "sell", 0.01)
-
-            print(
-                f"[INFO] current rsi = {round(rsi, 3)} | {time.strftime('%y.%m.%d %H:%M:%S', current_time)}"
-            )
-
-            time.sleep(2)
-
+            close = float(kline[4])
+            rsi = rsi_state.update(close, kline[0]) if closed else rsi_state.provisional(close)
+            side = trade_step(last["rsi"], rsi)
+            last["rsi"] = rsi
+            # One order at a time, its fill is tracked by the order manager in the background
+            if side is not None and not orders.has_open(asset):
+                await do_trade(asset, side, 0.01)
         except Exception as e:
             log("[ERR] " + str(e), include_traceback=True)
-            time.sleep(30)
+
+    stream = KlineStream(
+        asset, on_kline, interval="1m", ws_url=TESTNET_WS_URL, rest_url=TESTNET_REST_URL,
+        last_closed=rsi_state.last_open_time
+    )
+    try:
+        await asyncio.gather(stream.run(), orders.run())
+    finally:
+        orders.stop()
+
+
+def main():
+    asyncio.run(run_stream())
 
 
 if __name__ == "__main__":
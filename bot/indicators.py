@@ -0,0 +1,102 @@
+import math
+
+
+class StreamingRSI:
+    """
+    Wilder RSI kept as running state and updated in O(1) per closed candle.
+
+    Matches ta.rsi (rma smoothing: an exponentially weighted mean with alpha = 1 / window, adjusted for the
+    first values, at least `window` price changes) over every close fed since the first one: the state is the
+    decayed sums of gains and losses and of their weights.
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError(f"RSI window must be positive, got {window}.")
+        self.window: int = window
+        self.decay: float = 1 - 1 / window
+        self.gain: float = 0.0  # Decayed sums of price rises / falls
+        self.loss: float = 0.0
+        self.weight: float = 0.0  # Decayed number of price changes, the averages are gain / weight, loss / weight
+        self.changes: int = 0
+        self.last_close: float | None = None
+        self.last_open_time: int | None = None  # ms, of the last closed kline
+        self.interval: int | None = None  # ms, learned from consecutive klines
+
+    @property
+    def ready(self) -> bool:
+        return self.changes >= self.window
+
+    @property
+    def avg_gain(self) -> float:
+        return self.gain / self.weight if self.weight else math.nan
+
+    @property
+    def avg_loss(self) -> float:
+        return self.loss / self.weight if self.weight else math.nan
+
+    @property
+    def value(self) -> float:
+        """ RSI at the last closed candle, NaN while warming up """
+        return self._rsi(self.gain, self.loss, self.changes)
+
+    @property
+    def next_open_time(self) -> int | None:
+        """ Open time (ms) of the first kline not folded into the state yet, None before the first one """
+        if self.last_open_time is None or self.interval is None:
+            return self.last_open_time
+        return self.last_open_time + self.interval
+
+    def _rsi(self, gain: float, loss: float, changes: int) -> float:
+        if changes < self.window or gain + loss == 0:
+            return math.nan
+        return 100 * gain / (gain + loss)
+
+    def _step(self, close: float) -> tuple[float, float, float]:
+        change = close - self.last_close
+        return (
+            self.decay * self.gain + max(change, 0.0),
+            self.decay * self.loss + max(-change, 0.0),
+            self.decay * self.weight + 1,
+        )
+
+    def update(self, close: float, open_time: int = None) -> float:
+        """ Fold in a closed candle, candles at or before the last one's open_time are ignored. Returns the RSI. """
+        if open_time is not None and self.last_open_time is not None:
+            if open_time <= self.last_open_time:
+                return self.value
+            self.interval = self.interval or open_time - self.last_open_time
+        if self.last_close is not None:
+            self.gain, self.loss, self.weight = self._step(close)
+            self.changes += 1
+        self.last_close = close
+        self.last_open_time = open_time if open_time is not None else self.last_open_time
+        return self.value
+
+    def provisional(self, close: float) -> float:
+        """ RSI if the forming candle closed at `close` now, the state is left as it is """
+        if self.last_close is None:
+            return math.nan
+        gain, loss, _ = self._step(close)
+        return self._rsi(gain, loss, self.changes + 1)
+
+    def feed(self, klines: list[list]) -> float:
+        """
+        Binance klines (open time first, close fifth) as get_klines returns them: all but the last one are closed
+        and folded in, the last one is the forming candle. Returns its provisional RSI.
+        A kline that closed after being fetched as the forming one is folded in on the next feed.
+        """
+        if not klines:
+            return self.value
+        for kline in klines[:-1]:
+            self.update(float(kline[4]), int(kline[0]))
+        if self.last_open_time is not None and int(klines[-1][0]) <= self.last_open_time:
+            return self.value
+        return self.provisional(float(klines[-1][4]))
+
+    @classmethod
+    def from_klines(cls, klines: list[list], window: int) -> "StreamingRSI":
+        """ Warmed up once from history, e.g. the last 2 hours of 1m klines """
+        state = cls(window)
+        state.feed(klines)
+        return state
@@ -0,0 +1,183 @@
+import asyncio
+import functools
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import ROUND_DOWN, Decimal
+from typing import Any, Awaitable, Callable
+
+FINAL_STATUSES = {"FILLED", "CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH"}
+TIMEOUT_POLICIES = ("cancel", "replace")
+
+
+@dataclass
+class TrackedOrder:
+    """ An order placed through the OrderManager, order holds the latest REST / execution report fields """
+    symbol: str
+    side: str
+    quantity: float
+    order: dict
+    placed_at: float = field(default_factory=time.monotonic)
+    replaces: int = 0  # Orders this one was cancelled and replaced by so far
+    timed_out: bool = False
+    replaced_by: "TrackedOrder | None" = None
+
+    @property
+    def order_id(self) -> int:
+        return self.order["orderId"]
+
+    @property
+    def status(self) -> str:
+        return self.order["status"]
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    @property
+    def executed(self) -> float:
+        return float(self.order.get("executedQty", 0))
+
+    @property
+    def quote(self) -> float:
+        """ Total price paid / received so far """
+        return float(self.order.get("cummulativeQuoteQty", 0))
+
+
+@dataclass
+class OrderManager:
+    """
+    Places orders and tracks them until they are done, without blocking the event loop.
+
+    Client calls (python-binance Client) run one at a time on a worker thread. Open orders are tracked together:
+    every poll_interval seconds one get_open_orders request per symbol covers all of them, get_order is only
+    requested for orders that left the open list, to read their final state. Execution report events of a user
+    data stream can be passed to handle_execution_report() instead / as well.
+
+    timeout         -> seconds an order may stay open, then it is cancelled
+    on_timeout      -> "cancel", or "replace": the unfilled rest, rounded down to the symbol's LOT_SIZE step, is
+                       placed again as a market order (unless below minQty), at most max_replaces times per order
+    on_fill(order)  -> called once an order is completely filled
+    on_done(order)  -> called once an order ends any other way (cancelled, rejected, expired),
+                       order.replaced_by is the order placed for its unfilled rest, if any
+    Both callbacks may be coroutine functions.
+    """
+    client: Any
+    on_fill: Callable[[TrackedOrder], Awaitable[None] | None] = None
+    on_done: Callable[[TrackedOrder], Awaitable[None] | None] = None
+    poll_interval: float = 1.0
+    timeout: float = 30.0
+    on_timeout: str = "replace"
+    max_replaces: int = 1
+
+    def __post_init__(self):
+        if self.on_timeout not in TIMEOUT_POLICIES:
+            raise ValueError(f"Unknown timeout policy {self.on_timeout}, use one of {TIMEOUT_POLICIES}")
+        self.orders: dict[int, TrackedOrder] = {}  # Open orders by order id
+        self._lot_sizes: dict[str, tuple[Decimal, Decimal]] = {}  # (minQty, stepSize) per symbol
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="orders")
+        self._stopped: bool = False
+
+    async def _call(self, method: str, **params) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(getattr(self.client, method), **params))
+
+    def has_open(self, symbol: str = None) -> bool:
+        return any(symbol is None or order.symbol == symbol for order in self.orders.values())
+
+    async def submit(self, symbol: str, side: str, quantity: float, order_type: str = "MARKET", price: float = None,
+                     replaces: int = 0) -> TrackedOrder:
+        """ Place an order (side "buy" / "sell") and track it, returns without waiting for the fill """
+        params = {"symbol": symbol, "side": side.upper(), "type": order_type, "quantity": quantity}
+        if price is not None:
+            params.update(price=price, timeInForce="GTC")
+        response = await self._call("create_order", **params)
+        if response.get("orderId") is None:
+            raise ValueError(f"Failed to get a valid order, order_id is None. {symbol=} {side=} {quantity=}")
+
+        order = TrackedOrder(symbol, side, quantity, response, replaces=replaces)
+        print(f"[ORDER] {side} {quantity} {symbol}: #{order.order_id} {order.status}")
+        self.orders[order.order_id] = order
+        await self._update(order, response)
+        return order
+
+    async def lot_size(self, symbol: str) -> tuple[Decimal, Decimal]:
+        """ (minQty, stepSize) of the symbol's LOT_SIZE filter, requested once per symbol """
+        if symbol not in self._lot_sizes:
+            info = await self._call("get_symbol_info", symbol=symbol)
+            lot = next(f for f in info["filters"] if f["filterType"] == "LOT_SIZE")
+            self._lot_sizes[symbol] = Decimal(lot["minQty"]), Decimal(lot["stepSize"])
+        return self._lot_sizes[symbol]
+
+    async def _rest(self, order: TrackedOrder) -> Decimal:
+        """ Unfilled quantity rounded down to the step size, 0 if that is below the minimum order quantity """
+        min_qty, step = await self.lot_size(order.symbol)
+        rest = Decimal(str(order.quantity)) - Decimal(order.order.get("executedQty", "0"))
+        if step > 0:
+            rest = (rest / step).to_integral_value(rounding=ROUND_DOWN) * step
+        return rest if rest >= min_qty and rest > 0 else Decimal(0)
+
+    async def _notify(self, callback: Callable | None, order: TrackedOrder):
+        if callback is None:
+            return
+        result = callback(order)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _update(self, order: TrackedOrder, fields: dict):
+        """ Apply new order fields, finish the order once it reached a final status """
+        order.order.update(fields)
+        if not order.done or self.orders.pop(order.order_id, None) is None:
+            return
+        if order.status == "FILLED":
+            await self._notify(self.on_fill, order)
+            return
+        if self.on_timeout == "replace" and order.timed_out and order.replaces < self.max_replaces:
+            try:
+                rest = await self._rest(order)
+                if rest > 0:
+                    print(f"[ORDER] #{order.order_id} {order.status} after timeout, replacing the rest ({rest}) "
+                          f"at market")
+                    order.replaced_by = await self.submit(order.symbol, order.side, float(rest),
+                                                          replaces=order.replaces + 1)
+                else:
+                    print(f"[ORDER] #{order.order_id} {order.status} after timeout, rest below the minimum quantity")
+            except Exception as e:
+                print(f"[ORDER] #{order.order_id} replacing the rest failed: {e!r}")
+        await self._notify(self.on_done, order)
+
+    async def handle_execution_report(self, event: dict):
+        """ executionReport event of the user data stream """
+        order = self.orders.get(event.get("i"))
+        if order is not None:
+            fields = {"status": event["X"], "executedQty": event["z"], "cummulativeQuoteQty": event["Z"]}
+            await self._update(order, fields)
+
+    async def poll(self):
+        """ One batched status refresh of every open order, cancelling the ones past their timeout """
+        for symbol in {order.symbol for order in self.orders.values()}:
+            open_orders = {order["orderId"]: order for order in await self._call("get_open_orders", symbol=symbol)}
+            for order in [order for order in self.orders.values() if order.symbol == symbol]:
+                if order.order_id in open_orders:
+                    await self._update(order, open_orders[order.order_id])
+                else:
+                    await self._update(order, await self._call("get_order", symbol=symbol, orderId=order.order_id))
+                if not order.done and time.monotonic() - order.placed_at > self.timeout:
+                    print(f"[ORDER] #{order.order_id} still {order.status} after {self.timeout}s, cancelling")
+                    order.timed_out = True
+                    await self._update(order, await self._call("cancel_order", symbol=symbol, orderId=order.order_id))
+
+    async def run(self):
+        """ Poll until stop() is called, errors are reported and the next poll retries """
+        while not self._stopped:
+            if self.orders:
+                try:
+                    await self.poll()
+                except Exception as e:
+                    print(f"[ORDER] Status poll failed: {e!r}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stop(self):
+        self._stopped = True
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,129 @@
+import asyncio
+import inspect
+import json
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import aiohttp
+
+BINANCE_WS_URL = "wss://stream.binance.com:9443/ws"
+BINANCE_REST_URL = "https://api.binance.com/api"
+TESTNET_WS_URL = "wss://testnet.binance.vision/ws"
+TESTNET_REST_URL = "https://testnet.binance.vision/api"
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000,
+}
+REST_LIMIT = 1000  # Max klines per /v3/klines request
+
+
+def kline_from_event(event: dict) -> tuple[list, bool]:
+    """
+    Websocket kline event (raw, or wrapped in a combined stream {"stream", "data"} envelope) -> the kline as a row
+    like the REST /v3/klines returns it, and whether it is closed
+    """
+    k = event.get("data", event)["k"]
+    return [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"], k["T"], k["q"], k["n"], k["V"], k["Q"], k["B"]], k["x"]
+
+
+@dataclass
+class KlineStream:
+    """
+    Push-based klines of one symbol from the Binance websocket <symbol>@kline_<interval> stream.
+
+    on_kline(kline, closed) gets every update of the forming kline and every closed kline exactly once, in order.
+    It may be a coroutine function. Klines are rows in the REST format (open time ms first, close price fifth).
+    last_closed   -> open time (ms) of the last closed kline the caller already has, e.g. from a REST warm-up
+    The connection is re-established with full-jitter exponential backoff after errors, server disconnects
+    or receive_timeout seconds without a message. Closed klines missed in between are fetched from REST
+    before the first kline received after them.
+    """
+    symbol: str
+    on_kline: Callable[[list, bool], Awaitable[None] | None]
+    interval: str = "1m"
+    ws_url: str = BINANCE_WS_URL
+    rest_url: str = BINANCE_REST_URL
+    last_closed: int | None = None
+    receive_timeout: float = 60.0
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    timeout: float = 10.0
+
+    def __post_init__(self):
+        if self.interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported kline interval {self.interval}, use one of {list(INTERVAL_MS)}")
+        self.interval_ms: int = INTERVAL_MS[self.interval]
+        self.connections: int = 0
+        self.filled: int = 0  # Closed klines fetched from REST to fill gaps
+        self._stopped: bool = False
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.ws_url}/{self.symbol.lower()}@kline_{self.interval}"
+
+    async def _emit(self, kline: list, closed: bool):
+        if closed:
+            if self.last_closed is not None and kline[0] <= self.last_closed:
+                return
+            self.last_closed = kline[0]
+        result = self.on_kline(kline, closed)
+        if inspect.isawaitable(result):
+            await result
+
+    async def fill_gap(self, session: aiohttp.ClientSession, before: int):
+        """ Closed klines after last_closed and before open time `before` (ms) from REST, handed to on_kline """
+        start = self.last_closed + self.interval_ms
+        while start < before:
+            params = {
+                "symbol": self.symbol.upper(), "interval": self.interval,
+                "startTime": start, "endTime": before - 1, "limit": REST_LIMIT,
+            }
+            async with session.get(f"{self.rest_url}/v3/klines", params=params) as response:
+                response.raise_for_status()
+                klines = [kline for kline in await response.json() if kline[0] < before]
+            if not klines:
+                break
+            for kline in klines:
+                await self._emit(kline, True)
+            self.filled += len(klines)
+            start = klines[-1][0] + self.interval_ms
+
+    async def _handle(self, session: aiohttp.ClientSession, event: dict):
+        kline, closed = kline_from_event(event)
+        if self.last_closed is not None and kline[0] > self.last_closed + self.interval_ms:
+            await self.fill_gap(session, kline[0])
+        await self._emit(kline, closed)
+
+    async def run(self, session: aiohttp.ClientSession = None):
+        """ Stream until stop() is called """
+        if session is None:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                return await self.run(session)
+
+        attempt = 0
+        while not self._stopped:
+            try:
+                async with session.ws_connect(self.url, receive_timeout=self.receive_timeout, heartbeat=20) as ws:
+                    self._ws = ws
+                    self.connections += 1
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            break
+                        await self._handle(session, json.loads(message.data))
+                        attempt = 0
+                if not self._stopped:
+                    print(f"[STREAM] {self.url} closed by the server, reconnecting")
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                print(f"[STREAM] {self.url}: {e!r}, reconnecting")
+            finally:
+                self._ws = None
+            if not self._stopped:
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+                attempt += 1
+
+    async def stop(self):
+        self._stopped = True
+        if self._ws is not None:
+            await self._ws.close()
@@ -0,0 +1,101 @@
+""" Local stand-in for the Binance kline websocket stream and the REST /v3/klines endpoint, deterministic klines """
+import argparse
+import asyncio
+import math
+
+from aiohttp import web
+
+START = 1672531200000  # 2023-01-01 00:00 UTC, ms
+
+
+def synthetic_kline(open_time: int, interval_ms: int = 60_000, progress: float = 1.0) -> list:
+    """ Deterministic kline as a REST row, progress < 1 is the forming kline part way through """
+    def price(t: float) -> float:
+        return 30000 + 500 * math.sin(t / 3.6e6) + 40 * math.sin(t / 2.3e5) + 15 * math.sin(t / 7e4)
+
+    open_ = price(open_time)
+    close = price(open_time + progress * interval_ms)
+    volume = (1 + (open_time // interval_ms) % 13) * progress
+    return [
+        open_time, f"{open_:.2f}", f"{max(open_, close) + 3:.2f}", f"{min(open_, close) - 3:.2f}", f"{close:.2f}",
+        f"{volume:.8f}", open_time + interval_ms - 1, f"{volume * close:.8f}", int(10 * volume), "0", "0", "0",
+    ]
+
+
+def kline_event(symbol: str, interval: str, kline: list, closed: bool) -> dict:
+    """ REST row -> websocket kline event """
+    return {
+        "e": "kline", "E": kline[6] if closed else kline[0], "s": symbol,
+        "k": {
+            "t": kline[0], "T": kline[6], "s": symbol, "i": interval, "f": 0, "L": 0,
+            "o": kline[1], "c": kline[4], "h": kline[2], "l": kline[3], "v": kline[5], "n": kline[8],
+            "x": closed, "q": kline[7], "V": kline[9], "Q": kline[10], "B": kline[11],
+        },
+    }
+
+
+def create_app(interval_ms: int = 60_000, updates: int = 3, tick: float = 0.01, drop_after: int = 0,
+               skip_on_reconnect: int = 0) -> web.Application:
+    """
+    Klines follow a simulated clock: every `tick` seconds the forming kline is updated, after `updates` updates
+    it is sent closed and the next one starts.
+    drop_after         -> the server closes every connection after this many messages
+    skip_on_reconnect  -> klines the clock moves on while a client reconnects (missed closes to fill from REST)
+    """
+    state = {"open_time": START, "step": 0, "connections": 0, "messages": 0, "rest_requests": 0}
+
+    async def stream(request: web.Request) -> web.WebSocketResponse:
+        symbol, _, interval = request.match_info["stream"].upper().partition("@KLINE_")
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        state["connections"] += 1
+        if state["connections"] > 1:
+            state["open_time"] += skip_on_reconnect * interval_ms
+            state["step"] = 0
+
+        closing = asyncio.create_task(ws.receive())  # Returns once the client closes the connection
+        sent = 0
+        while not closing.done() and (not drop_after or sent < drop_after):
+            state["step"] += 1
+            closed = state["step"] > updates
+            kline = synthetic_kline(state["open_time"], interval_ms, 1.0 if closed else state["step"] / (updates + 1))
+            await ws.send_json(kline_event(symbol, interval.lower(), kline, closed))
+            sent += 1
+            state["messages"] += 1
+            if closed:
+                state["open_time"] += interval_ms
+                state["step"] = 0
+            await asyncio.sleep(tick)
+        closing.cancel()
+        await ws.close()
+        return ws
+
+    async def klines(request: web.Request) -> web.Response:
+        state["rest_requests"] += 1
+        start = int(request.query.get("startTime", START))
+        end = int(request.query.get("endTime", state["open_time"]))
+        limit = int(request.query.get("limit", 500))
+        first = START + -(-(start - START) // interval_ms) * interval_ms  # First open time >= start
+        rows = [
+            synthetic_kline(t, interval_ms, 1.0 if t < state["open_time"] else state["step"] / (updates + 1))
+            for t in range(first, min(end, state["open_time"]) + 1, interval_ms)
+        ]
+        return web.json_response(rows[:limit])
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/ws/{stream}", stream)
+    app.router.add_get("/api/v3/klines", klines)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve a synthetic Binance kline stream locally")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--tick", type=float, default=1.0, help="Seconds between stream messages")
+    parser.add_argument("--updates", type=int, default=3, help="Updates of the forming kline before it closes")
+    parser.add_argument("--drop-after", type=int, default=0)
+    parser.add_argument("--skip-on-reconnect", type=int, default=0)
+    args = parser.parse_args()
+    web.run_app(create_app(updates=args.updates, tick=args.tick, drop_after=args.drop_after,
+                           skip_on_reconnect=args.skip_on_reconnect), port=args.port)
@@ -0,0 +1,202 @@
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import settings
+
+PROFILE_DIR = os.path.join(settings.DATA_DIR, "profiles")
+MAX_EVENTS = 100_000  # Raw spans kept for the trace, a long running bot only keeps the latest ones
+_DISABLED = nullcontext()
+_STACK: ContextVar[tuple] = ContextVar("profiling_stack", default=())  # Open spans of this thread / asyncio task
+
+
+class Profiler:
+    """
+    Named, nested spans with wall and CPU time, and the peak traced allocation when memory tracking is on.
+
+    Disabled (the default) a span is one attribute check and a shared no-op context manager. Enabled with the
+    PROFILE environment variable (plus PROFILE_MEMORY for allocations) or enable(); a span's name is its path of
+    enclosing spans, e.g. "GridBacktester.run_backtest/evaluate_window/portfolio". Spans opened in worker processes
+    (process pools) are not recorded. CPU time is process-wide, so it includes threads started by the span.
+    """
+
+    def __init__(self, enabled: bool = False, memory: bool = False, max_events: int = MAX_EVENTS):
+        self.enabled: bool = False
+        self.memory: bool = False
+        self.stages: dict[str, dict] = {}
+        self.events: deque = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._origin: float = time.perf_counter()
+        if enabled:
+            self.enable(memory)
+
+    def enable(self, memory: bool = False):
+        """ Start recording spans, with memory = True also the peak allocation of each span (slower) """
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.memory = False
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+            self.events.clear()
+            self._origin = time.perf_counter()
+
+    def span(self, name: str):
+        """ Context manager timing the block under `name` """
+        if not self.enabled:
+            return _DISABLED
+        return self._span(name)
+
+    def profiled(self, name: str = None):
+        """ Decorator putting every call of the function in a span (default name: the function's qualified name) """
+        def decorator(function):
+            label = name or function.__qualname__
+
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def coroutine_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await function(*args, **kwargs)
+                    with self._span(label):
+                        return await function(*args, **kwargs)
+
+                return coroutine_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._span(label):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def _span(self, name: str):
+        stack = _STACK.get()
+        path = f"{stack[-1]['path']}/{name}" if stack else name
+        frame = {"path": path, "children": 0.0, "peak": 0}
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["start_memory"] = current
+        token = _STACK.set(stack + (frame,))
+        start, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+            _STACK.reset(token)
+            peak_mb = None
+            if memory:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak_mb = (peak - frame["start_memory"]) / 2 ** 20
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            if stack:
+                stack[-1]["children"] += wall
+            self._record(path, start, wall, cpu, wall - frame["children"], peak_mb)
+
+    def _record(self, path: str, start: float, wall: float, cpu: float, self_wall: float, peak_mb: float | None):
+        with self._lock:
+            stage = self.stages.setdefault(
+                path, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "self_s": 0.0, "max_s": 0.0, "peak_mb": None}
+            )
+            stage["calls"] += 1
+            stage["wall_s"] += wall
+            stage["cpu_s"] += cpu
+            stage["self_s"] += self_wall
+            stage["max_s"] = max(stage["max_s"], wall)
+            if peak_mb is not None:
+                stage["peak_mb"] = max(stage["peak_mb"] or 0.0, peak_mb)
+            self.events.append((path, start - self._origin, wall, cpu, peak_mb, threading.get_ident()))
+
+    def breakdown(self) -> list[dict]:
+        """ Totals per stage (span path), slowest first; self_s is the wall time not spent in nested spans """
+        with self._lock:
+            rows = [{"stage": path, **stage} for path, stage in self.stages.items()]
+        return sorted(rows, key=lambda row: row["wall_s"], reverse=True)
+
+    def print_breakdown(self):
+        rows = self.breakdown()
+        if not rows:
+            return
+        width = max(len(row["stage"]) for row in rows)
+        print(f"{'stage':<{width}} {'calls':>7} {'wall_s':>10} {'self_s':>10} {'cpu_s':>10} {'peak_mb':>9}")
+        for row in rows:
+            peak = f"{row['peak_mb']:9.2f}" if row["peak_mb"] is not None else f"{'-':>9}"
+            print(f"{row['stage']:<{width}} {row['calls']:>7} {row['wall_s']:10.4f} {row['self_s']:10.4f} "
+                  f"{row['cpu_s']:10.4f} {peak}")
+
+    def export_json(self, path: str) -> str:
+        """ Per-stage breakdown as a JSON report """
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "memory": self.memory,
+            "stages": self.breakdown(),
+        }
+        return self._write(path, report)
+
+    def export_trace(self, path: str) -> str:
+        """
+        Every recorded span in the Chrome trace event format, a flame chart in chrome://tracing, Perfetto
+        or speedscope
+        """
+        with self._lock:
+            events = list(self.events)
+        pid = os.getpid()
+        trace = [
+            {
+                "name": span_path.rsplit("/", 1)[-1], "cat": span_path, "ph": "X", "pid": pid, "tid": tid,
+                "ts": start * 1e6, "dur": wall * 1e6,
+                "args": {"cpu_s": cpu, **({"peak_mb": peak_mb} if peak_mb is not None else {})},
+            }
+            for span_path, start, wall, cpu, peak_mb, tid in events
+        ]
+        return self._write(path, {"traceEvents": trace, "displayTimeUnit": "ms"})
+
+    @staticmethod
+    def _write(path: str, content: dict) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(content, file, indent=1)
+        return path
+
+
+profiler = Profiler(enabled=bool(os.getenv("PROFILE")), memory=bool(os.getenv("PROFILE_MEMORY")))
+span = profiler.span
+profiled = profiler.profiled
+
+
+@atexit.register
+def _export_on_exit():
+    """ A run with PROFILE set prints its breakdown and leaves a report and a trace in PROFILE_DIR """
+    if not os.getenv("PROFILE") or not profiler.enabled or not profiler.stages:
+        return
+    profiler.print_breakdown()
+    name = f"profile_{datetime.now():%Y%m%d-%H%M%S}_{os.getpid()}"
+    profiler.export_json(os.path.join(PROFILE_DIR, f"{name}.json"))
+    profiler.export_trace(os.path.join(PROFILE_DIR, f"{name}.trace.json"))
+    print(f"Profile written to {os.path.join(PROFILE_DIR, name)}.json / .trace.json")
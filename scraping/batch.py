@@ -0,0 +1,94 @@
+import asyncio
+from typing import Sequence
+
+import pandas as pd
+
+from scraping.fetcher import AsyncFetcher, FetchResult
+from scraping.manifest import refresh_store
+from scraping.pipeline import StreamReport
+from scraping.planner import plan_windows, window_params
+from scraping.scraper import Scraper
+
+
+class BatchScraper:
+    """
+    Scrapes many pairs and intervals at once.
+
+    Every chunk request of every (pair, interval) job goes through one pooled keep-alive session,
+    so the fetcher's concurrency and per-host rate limits are global for the whole batch.
+    """
+
+    def __init__(self, currency_pairs: Sequence[str], intervals: Sequence[int] = (60,),
+                 base_url: str = "https://www.bitstamp.net", fetcher: AsyncFetcher = None):
+        self.fetcher: AsyncFetcher = fetcher or AsyncFetcher()
+        # One Scraper per job keeps the per-job state (dates, df, failed requests) where it already lives
+        self.scrapers: dict[tuple[str, int], Scraper] = {
+            (pair, interval): Scraper(currency_pair=pair, base_url=base_url, fetcher=self.fetcher)
+            for pair in currency_pairs
+            for interval in intervals
+        }
+
+    def set_time_range(self, range_size: int):
+        for scraper in self.scrapers.values():
+            scraper.set_time_range(range_size)
+
+    @property
+    def failed_requests(self) -> dict[tuple[str, int], list[FetchResult]]:
+        return {key: scraper.failed_requests for key, scraper in self.scrapers.items() if scraper.failed_requests}
+
+    def scrape(self) -> dict[tuple[str, int], pd.DataFrame]:
+        """ Cleaned DataFrame per (pair, interval) """
+        asyncio.run(self._scrape())
+        return {key: scraper.get_dataframe() for key, scraper in self.scrapers.items()}
+
+    def scrape_to_store(self) -> dict[tuple[str, int], StreamReport]:
+        """ Stream every job into its own CandleStore (<pair>_<interval>), resuming existing stores """
+        reports = asyncio.run(self._scrape_to_store())
+        for (pair, interval), report in reports.items():
+            print(f"{pair} {interval}s: stored {report.rows} candles, {len(report.failed)} requests failed.")
+        return reports
+
+    async def _scrape(self):
+        semaphore = asyncio.Semaphore(self.fetcher.concurrency)
+        async with self.fetcher.session() as session:
+            async def run_job(interval: int, scraper: Scraper):
+                scraper.interval = interval
+                windows = plan_windows(scraper.dates[0], scraper.dates[-1], interval, scraper.request_limit)
+                params_list = window_params(windows, interval, scraper.request_limit)
+                results = await self.fetcher.fetch_all(scraper.url, params_list, session=session, semaphore=semaphore)
+                scraper.failed_requests = [result for result in results if not result.ok]
+                scraper.df = pd.DataFrame([candle for result in results if result.ok for candle in result.candles])
+
+            await asyncio.gather(*(run_job(interval, scraper) for (_, interval), scraper in self.scrapers.items()))
+
+    async def _scrape_to_store(self) -> dict[tuple[str, int], StreamReport]:
+        semaphore = asyncio.Semaphore(self.fetcher.concurrency)
+        async with self.fetcher.session() as session:
+            async def run_job(interval: int, scraper: Scraper) -> StreamReport:
+                writer, params_list = scraper.plan_store_update(interval)
+                results = self.fetcher.stream(scraper.url, params_list, session=session, semaphore=semaphore)
+                async for result in results:
+                    writer.feed(result)
+                    if writer.stopped:
+                        break
+                await results.aclose()
+                scraper.failed_requests = writer.report.failed
+                refresh_store(writer.store, interval)
+                return writer.report
+
+            reports = await asyncio.gather(
+                *(run_job(interval, scraper) for (_, interval), scraper in self.scrapers.items())
+            )
+        return dict(zip(self.scrapers, reports))
+
+
+SETUP = {
+    "currency_pairs": ["btcusd", "ethusd", "btcusdt", "ethusdt"],
+    "intervals": [60],  # Length of one cline, sec
+    "range_size": 30,  # Number of Days in scraping period
+}
+
+if __name__ == '__main__':
+    batch = BatchScraper(currency_pairs=SETUP["currency_pairs"], intervals=SETUP["intervals"])
+    batch.set_time_range(range_size=SETUP["range_size"])
+    batch.scrape_to_store()
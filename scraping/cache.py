@@ -0,0 +1,97 @@
+import json
+import os
+
+import pandas as pd
+
+import settings
+from scraping.manifest import refresh_store
+from scraping.planner import align_up
+from scraping.store import CandleStore
+
+CACHE_DIR = os.path.join(settings.DATA_DIR, "cache")
+OHLC_COLUMNS = ["timestamp", "open", "high", "low", "close", "volume"]
+
+
+def merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """ Merge overlapping / touching [start, end) ranges into a sorted disjoint list """
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class CandleCache:
+    """
+    Persistent per-pair, per-interval candle cache.
+
+    Candles live in a CandleStore, the timestamp ranges already scraped live in a json sidecar.
+    Ranges are half-open [start, end) in unix seconds and refer to candle timestamps.
+    """
+
+    def __init__(self, currency_pair: str, interval: int, cache_dir: str = CACHE_DIR):
+        self.currency_pair: str = currency_pair
+        self.interval: int = interval
+        name = f"{currency_pair}_{interval}"
+        self.store: CandleStore = CandleStore(name, store_dir=cache_dir)
+        self.ranges_path: str = os.path.join(cache_dir, f"{name}.json")
+        self.ranges: list[tuple[int, int]] = self._load_ranges()
+
+    def _load_ranges(self) -> list[tuple[int, int]]:
+        if not os.path.isfile(self.ranges_path):
+            return []
+        with open(self.ranges_path, "r") as file:
+            return [(int(start), int(end)) for start, end in json.load(file)["ranges"]]
+
+    def _save_ranges(self):
+        os.makedirs(os.path.dirname(self.ranges_path), exist_ok=True)
+        tmp_path = self.ranges_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"ranges": self.ranges}, file)
+        os.replace(tmp_path, self.ranges_path)
+
+    def missing_ranges(self, start: int, end: int) -> list[tuple[int, int]]:
+        """ Parts of [start, end) which are not covered by the cache yet, start is aligned up to the interval """
+        gaps = []
+        cursor = align_up(start, self.interval)
+        for first, last in self.ranges:
+            if last <= cursor:
+                continue
+            if first >= end:
+                break
+            if first > cursor:
+                gaps.append((cursor, first))
+            cursor = last
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def add(self, df: pd.DataFrame, ranges: list[tuple[int, int]]):
+        """ Merge freshly scraped candles in and mark the scraped ranges as covered """
+        df = df.reindex(columns=OHLC_COLUMNS).apply(pd.to_numeric)
+        df["timestamp"] = df["timestamp"].astype("int64")
+        inside = pd.Series(False, index=df.index)
+        for start, end in ranges:
+            inside |= (df["timestamp"] >= start) & (df["timestamp"] < end)
+
+        df = df[inside].drop_duplicates(subset="timestamp", keep="last").sort_values(by="timestamp")
+        stored_timestamps = self.store.read(["timestamp"])["timestamp"]
+        if not len(stored_timestamps) or df.empty or df["timestamp"].iloc[0] > stored_timestamps[-1]:
+            # Common case of extending the cache into the future: no rewrite needed
+            self.store.append(df)
+        else:
+            merged = pd.concat([self.store.load(), df], ignore_index=True)
+            merged = merged.drop_duplicates(subset="timestamp", keep="last").sort_values(by="timestamp")
+            self.store.write(merged)
+        refresh_store(self.store, self.interval)
+
+        # Ranges are written after the data, so an interrupted run never claims candles it does not have
+        self.ranges = merge_ranges(self.ranges + list(ranges))
+        self._save_ranges()
+
+    def load(self, start: int, end: int) -> pd.DataFrame:
+        return self.store.load(start=start, end=end)
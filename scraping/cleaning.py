@@ -0,0 +1,110 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from scraping.store import COLUMNS
+
+FILL_METHODS = (None, "ffill", "nan")
+
+
+@dataclass
+class IntegrityReport:
+    """ What clean_candles() found and changed. Gaps are [start, end) ranges of missing candle timestamps """
+    rows: int = 0
+    duplicates: int = 0
+    out_of_range: int = 0
+    was_sorted: bool = True
+    interval: int | None = None
+    gaps: list[tuple[int, int]] = field(default_factory=list)
+    missing: int = 0
+    filled: int = 0
+
+    def __str__(self):
+        return (f"{self.rows} candles, {self.duplicates} duplicates and {self.out_of_range} out of range dropped, "
+                f"{len(self.gaps)} gaps ({self.missing} missing candles, {self.filled} filled)")
+
+
+def infer_interval(timestamps: np.ndarray) -> int | None:
+    """ Most common step between sorted unique timestamps """
+    if len(timestamps) < 2:
+        return None
+    steps, counts = np.unique(np.diff(timestamps), return_counts=True)
+    return int(steps[np.argmax(counts)])
+
+
+def find_gaps(timestamps: np.ndarray, interval: int) -> list[tuple[int, int]]:
+    """ [start, end) ranges of missing candle timestamps in sorted unique timestamps """
+    steps = np.diff(timestamps)
+    return [(int(timestamps[i]) + interval, int(timestamps[i + 1])) for i in np.flatnonzero(steps > interval)]
+
+
+def clean_candles(df: pd.DataFrame, start: int = None, end: int = None, interval: int = None,
+                  fill: str = None) -> tuple[pd.DataFrame, IntegrityReport]:
+    """
+    Single pass over raw candles: numeric dtypes, dedupe + sort on the integer timestamp, trim to [start, end),
+    gap detection and optional gap filling ("ffill" carries the last close, "nan" inserts empty candles).
+    Every column is copied at most once. Cleaning a clean frame returns an equal frame.
+    """
+    if fill not in FILL_METHODS:
+        raise ValueError(f"Unknown fill method {fill}, expected one of {FILL_METHODS}")
+
+    report = IntegrityReport()
+    timestamps = pd.to_numeric(df["timestamp"]).to_numpy(dtype="int64")
+    in_range = np.ones(len(timestamps), dtype=bool)
+    if start is not None:
+        in_range &= timestamps >= start
+    if end is not None:
+        in_range &= timestamps < end
+    report.out_of_range = int(len(timestamps) - in_range.sum())
+
+    diffs = np.diff(timestamps)
+    if report.out_of_range == 0 and np.all(diffs > 0):
+        take = None  # Already sorted, unique and in range: only dtypes may change
+    else:
+        candidates = np.flatnonzero(in_range)
+        order = candidates[np.argsort(timestamps[candidates], kind="stable")]
+        sorted_timestamps = timestamps[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_timestamps[1:] != sorted_timestamps[:-1]
+        take = order[first]
+        report.duplicates = int(len(order) - len(take))
+        report.was_sorted = bool(np.all(np.diff(timestamps[candidates]) >= 0))
+        timestamps = timestamps[take]
+
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy() if take is None else df[column].to_numpy()[take]
+        if column == "timestamp":
+            values = timestamps
+        elif column in COLUMNS:
+            values = pd.to_numeric(values).astype(COLUMNS[column], copy=False)
+        columns[column] = values
+
+    report.rows = len(timestamps)
+    report.interval = interval or infer_interval(timestamps)
+    if report.interval:
+        report.gaps = find_gaps(timestamps, report.interval)
+        report.missing = sum((end - start) // report.interval for start, end in report.gaps)
+
+    cleaned = pd.DataFrame(columns, columns=df.columns)
+    if fill and report.gaps:
+        cleaned = _fill_gaps(cleaned, report.interval, fill)
+        report.filled = report.missing
+    return cleaned, report
+
+
+def _fill_gaps(df: pd.DataFrame, interval: int, fill: str) -> pd.DataFrame:
+    timestamps = df["timestamp"].to_numpy()
+    grid = np.arange(timestamps[0], timestamps[-1] + interval, interval, dtype="int64")
+    filled = df.set_index("timestamp").reindex(grid)
+    if fill == "ffill":
+        # Flat candle at the last close with zero volume, the usual convention for a minute without trades
+        close = filled["close"].ffill()
+        for column in ("open", "high", "low"):
+            if column in filled:
+                filled[column] = filled[column].fillna(close)
+        if "volume" in filled:
+            filled["volume"] = filled["volume"].fillna(0.0)
+        filled["close"] = close
+    return filled.rename_axis("timestamp").reset_index()[df.columns]
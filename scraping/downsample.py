@@ -0,0 +1,45 @@
+import numpy as np
+
+# Candle sizes a chart may be aggregated to, seconds
+TIMEFRAMES = [60, 180, 300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 6 * 3600, 12 * 3600, 86400, 3 * 86400, 7 * 86400]
+
+
+def candle_timeframe(timestamps: np.ndarray, interval: int, max_points: int) -> int:
+    """ Smallest standard timeframe (not below interval) that keeps the candle count within max_points """
+    if len(timestamps) <= max_points:
+        return interval
+    span = int(timestamps[-1] - timestamps[0]) + interval
+    for timeframe in TIMEFRAMES:
+        if timeframe >= interval and timeframe % interval == 0 and span / timeframe <= max_points:
+            return timeframe
+    return TIMEFRAMES[-1]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of max_points samples preserving the visual shape of a line.
+    First and last points are always kept.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, max_points - 1).astype("int64")  # Buckets between the fixed endpoints
+    indices = np.empty(max_points, dtype="int64")
+    indices[0], indices[-1] = 0, n - 1
+
+    selected = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+
+        area = np.abs(
+            (x[selected] - avg_x) * (y[lo:hi] - y[selected]) - (x[selected] - x[lo:hi]) * (avg_y - y[selected])
+        )
+        selected = lo + int(np.argmax(area))
+        indices[i + 1] = selected
+    return indices
@@ -0,0 +1,172 @@
+import asyncio
+import contextlib
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import aiohttp
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchResult:
+    """ Outcome of one OHLC request, candles is None when the request failed for good """
+    params: dict
+    candles: list[dict] | None = None
+    error: str | None = None
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.candles is not None
+
+
+class RateLimiter:
+    """
+    GCRA rate limiter: on average `rate` acquisitions per second, bursts of up to `burst`.
+    State is updated synchronously before sleeping, so no lock is needed and it is not bound to an event loop.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.interval: float = 1 / rate
+        self.tolerance: float = (burst - 1) * self.interval
+        self.arrival: float = 0.0  # Theoretical arrival time of the next request
+
+    async def acquire(self):
+        now = time.monotonic()
+        arrival = max(self.arrival, now)
+        self.arrival = arrival + self.interval
+        wait = arrival - self.tolerance - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class AsyncFetcher:
+    """
+    Asyncio engine for Bitstamp-style /ohlc/ requests.
+
+    concurrency       -> max requests in flight
+    rate_limit        -> default requests per second per host, host_rate_limits overrides it per host
+    max_retries       -> retries for 429 / 5xx / network errors, with full-jitter exponential backoff
+    """
+    concurrency: int = 8
+    rate_limit: float = 8.0
+    host_rate_limits: dict[str, float] = field(default_factory=dict)
+    max_retries: int = 5
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    timeout: float = 30.0
+
+    def __post_init__(self):
+        self._limiters: dict[str, RateLimiter] = {}
+
+    def _limiter(self, url: str) -> RateLimiter:
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            rate = self.host_rate_limits.get(host, self.rate_limit)
+            self._limiters[host] = RateLimiter(rate, burst=max(1, int(rate)))
+        return self._limiters[host]
+
+    def _delay(self, attempt: int, retry_after: str | None = None) -> float:
+        if retry_after is not None:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _fetch_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                         url: str, params: dict) -> FetchResult:
+        result = FetchResult(params=params)
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                result.attempts = attempt + 1
+                retry_after = None
+                await self._limiter(url).acquire()
+                try:
+                    async with session.get(url, params=params) as response:
+                        if response.status == 200:
+                            payload = await response.json(content_type=None)
+                            result.candles = payload["data"]["ohlc"]
+                            result.error = None
+                            return result
+                        result.error = f"HTTP {response.status}"
+                        if response.status not in RETRY_STATUSES:
+                            return result
+                        retry_after = response.headers.get("Retry-After")
+                except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                    result.error = f"{type(e).__name__}: {e}"
+
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._delay(attempt, retry_after))
+        return result
+
+    @contextlib.asynccontextmanager
+    async def session(self, session: aiohttp.ClientSession = None):
+        """ Pooled keep-alive session sized to the concurrency limit, or the given session as is """
+        if session is not None:
+            yield session
+            return
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            yield session
+
+    async def fetch_all(self, url: str, params_list: list[dict], session: aiohttp.ClientSession = None,
+                        semaphore: asyncio.Semaphore = None) -> list[FetchResult]:
+        """
+        Results come back in the order of params_list, failed requests are reported, not raised.
+        Pass a shared session / semaphore to apply one connection pool and concurrency limit across calls.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        async with self.session(session) as session:
+            return await asyncio.gather(*(self._fetch_one(session, semaphore, url, p) for p in params_list))
+
+    async def stream(self, url: str, params_list: list[dict], session: aiohttp.ClientSession = None,
+                     semaphore: asyncio.Semaphore = None):
+        """
+        Async generator over results in params_list order.
+        At most `concurrency` requests are scheduled ahead of the consumer, so memory does not grow with the range.
+        """
+        semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        params_iter = iter(params_list)
+        pending: deque[asyncio.Task] = deque()
+        async with self.session(session) as session:
+            def schedule():
+                params = next(params_iter, None)
+                if params is not None:
+                    pending.append(asyncio.create_task(self._fetch_one(session, semaphore, url, params)))
+
+            try:
+                for _ in range(self.concurrency):
+                    schedule()
+                while pending:
+                    result = await pending.popleft()
+                    schedule()
+                    yield result
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def run(self, url: str, params_list: list[dict]) -> list[FetchResult]:
+        """ Blocking wrapper around fetch_all """
+        return asyncio.run(self.fetch_all(url, params_list))
+
+    def iter_results(self, url: str, params_list: list[dict]):
+        """ Blocking generator wrapper around stream """
+        loop = asyncio.new_event_loop()
+        results = self.stream(url, params_list)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
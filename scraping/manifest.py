@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+import settings
+from scraping.cleaning import find_gaps, infer_interval
+from scraping.store import COLUMNS, CandleStore
+
+MANIFEST_PATH = os.path.join(settings.DATA_DIR, "manifest.json")
+HASH_CHUNK_ROWS = 1 << 20
+
+
+def content_hash(store: CandleStore) -> str:
+    """ blake2b over the stored rows of every column, independent of the store version """
+    digest = hashlib.blake2b(digest_size=16)
+    columns = store.read()
+    for column in sorted(columns):
+        values = columns[column]
+        digest.update(column.encode())
+        for lo in range(0, len(values), HASH_CHUNK_ROWS):
+            digest.update(np.ascontiguousarray(values[lo:lo + HASH_CHUNK_ROWS]).tobytes())
+    return digest.hexdigest()
+
+
+def describe_store(store: CandleStore, interval: int = None, with_hash: bool = True) -> dict:
+    """ Manifest entry of a store, with_hash = False leaves the hash (a full read of every column) as None """
+    meta = store.meta()
+    timestamps = store.read(["timestamp"])["timestamp"]
+    interval = interval or infer_interval(timestamps)
+    return {
+        "version": meta["version"],
+        "rows": meta["rows"],
+        "interval": interval,
+        "first": int(timestamps[0]) if len(timestamps) else None,
+        "last": int(timestamps[-1]) if len(timestamps) else None,
+        "gaps": find_gaps(timestamps, interval) if interval else [],
+        "hash": content_hash(store) if with_hash else None,
+        "updated": int(time.time()),
+    }
+
+
+class Manifest:
+    """
+    Index of the candle stores under settings.DATA_DIR: covered span, row count, gaps and a content hash per store.
+
+    Entries are keyed by the store path relative to DATA_DIR (e.g. "store/btcusdt_60"). An entry is current while
+    the store's meta.json still has the same version and row count, so checking it never touches the candle data.
+    The hash doubles as a stable cache key for anything derived from the data. It is computed on demand
+    (data_hash(), refresh(with_hash=True)), so keeping the manifest in sync after appends only reads timestamps.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path: str = path
+        self.entries: dict[str, dict] = {}
+        if os.path.isfile(path):
+            with open(path, "r") as file:
+                self.entries = json.load(file)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.entries, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def key(self, store: CandleStore) -> str:
+        key = os.path.relpath(store.path, os.path.dirname(self.path))
+        return os.path.abspath(store.path) if key.startswith("..") else key
+
+    def is_current(self, store: CandleStore) -> bool:
+        entry = self.entries.get(self.key(store))
+        meta = store.meta()
+        return entry is not None and (entry["version"], entry["rows"]) == (meta["version"], meta["rows"])
+
+    def refresh(self, store: CandleStore, interval: int = None, save: bool = True, with_hash: bool = False) -> dict:
+        """ Re-describe the store unless its entry is current, with_hash = True also hashes it if not done yet """
+        key = self.key(store)
+        changed = False
+        if not self.is_current(store):
+            interval = interval or self.entries.get(key, {}).get("interval")
+            self.entries[key] = describe_store(store, interval, with_hash)
+            changed = True
+        elif with_hash and self.entries[key].get("hash") is None:
+            self.entries[key]["hash"] = content_hash(store)
+            changed = True
+        if changed and save:
+            self.save()
+        return self.entries[key]
+
+    def get(self, store: CandleStore) -> dict | None:
+        return self.entries.get(self.key(store))
+
+    def data_hash(self, store: CandleStore) -> str:
+        return self.refresh(store, with_hash=True)["hash"]
+
+    def verify(self, store: CandleStore) -> list[str]:
+        """ Problems found with a store: truncated column files or content not matching the recorded hash """
+        problems = []
+        meta = store.meta()
+        for column, dtype in COLUMNS.items():
+            path = store.column_path(meta["version"], column)
+            expected = meta["rows"] * np.dtype(dtype).itemsize
+            size = os.path.getsize(path) if os.path.isfile(path) else 0
+            if size < expected:
+                problems.append(f"{column}: {size} bytes on disk, {expected} expected")
+        if problems:
+            return problems
+
+        entry = self.get(store)
+        if entry is None:
+            problems.append("not in manifest")
+        elif not self.is_current(store):
+            problems.append("manifest entry is outdated")
+        elif entry.get("hash") is None:
+            problems.append("no content hash recorded")
+        elif content_hash(store) != entry["hash"]:
+            problems.append("content hash mismatch")
+        return problems
+
+
+def find_stores(data_dir: str = settings.DATA_DIR) -> list[CandleStore]:
+    """ Every CandleStore directory under data_dir """
+    stores = []
+    for root, _, files in os.walk(data_dir):
+        if "meta.json" in files:
+            stores.append(CandleStore(os.path.basename(root), store_dir=os.path.dirname(root)))
+    return sorted(stores, key=lambda store: store.path)
+
+
+def refresh_store(store: CandleStore, interval: int = None):
+    """ Keep the default manifest in sync after a store was written, the content hash is left for data_hash() """
+    Manifest().refresh(store, interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Index and verify candle stores in the data directory")
+    parser.add_argument("--verify", action="store_true", help="Re-hash every store and report mismatches")
+    args = parser.parse_args()
+
+    manifest = Manifest()
+    for candle_store in find_stores():
+        if args.verify:
+            issues = manifest.verify(candle_store)
+            print(f"{manifest.key(candle_store)}: {'OK' if not issues else '; '.join(issues)}")
+            continue
+        info = manifest.refresh(candle_store, save=False, with_hash=True)
+        print(f"{manifest.key(candle_store)}: {info['rows']} rows, {len(info['gaps'])} gaps, {info['hash']}")
+    manifest.save()
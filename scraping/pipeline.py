@@ -0,0 +1,85 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+
+from scraping.fetcher import FetchResult
+from scraping.store import COLUMNS, CandleStore
+
+
+@dataclass
+class StreamReport:
+    rows: int = 0
+    chunks: int = 0
+    failed: list[FetchResult] = field(default_factory=list)
+
+
+def parse_candles(candles: list[dict]) -> dict[str, np.ndarray]:
+    """ Raw API candles (string values) -> typed column arrays sorted by timestamp, without duplicates """
+    columns = {
+        column: np.array([candle[column] for candle in candles], dtype=dtype)
+        for column, dtype in COLUMNS.items()
+    }
+    if np.any(np.diff(columns["timestamp"]) <= 0):
+        _, first = np.unique(columns["timestamp"], return_index=True)
+        columns = {column: values[first] for column, values in columns.items()}
+    return columns
+
+
+class StoreWriter:
+    """
+    Appends fetch results to a store one response at a time, keeping only [start, end) and newer candles.
+    Results must arrive in window order. After a failed request nothing more is appended (stopped is set, callers
+    stop fetching), so the store ends right before the failed window and the next run, which resumes after
+    the last stored candle, requests it again.
+    """
+
+    def __init__(self, store: CandleStore, start: int, end: int):
+        self.store: CandleStore = store
+        self.start: int = start
+        self.end: int = end
+        self.report: StreamReport = StreamReport()
+
+    @property
+    def stopped(self) -> bool:
+        return bool(self.report.failed)
+
+    def feed(self, result: FetchResult):
+        if self.stopped:
+            return
+        if not result.ok:
+            self.report.failed.append(result)
+            return
+        if not result.candles:
+            return
+
+        chunk = parse_candles(result.candles)
+        timestamps = chunk["timestamp"]
+        keep = (timestamps >= self.start) & (timestamps < self.end)
+        if not keep.all():
+            chunk = {column: values[keep] for column, values in chunk.items()}
+        if not len(chunk["timestamp"]):
+            return
+
+        self.store.append(chunk)
+        self.start = int(chunk["timestamp"][-1]) + 1
+        self.report.rows += len(chunk["timestamp"])
+        self.report.chunks += 1
+
+    def feed_all(self, results: Iterable[FetchResult]) -> StreamReport:
+        """
+        Feed results until the first failed one. A results generator is closed then, which cancels the requests
+        still in flight of AsyncFetcher.iter_results.
+        """
+        for result in results:
+            self.feed(result)
+            if self.stopped:
+                break
+        if hasattr(results, "close"):
+            results.close()
+        return self.report
+
+
+def stream_to_store(results: Iterable[FetchResult], store: CandleStore, start: int, end: int) -> StreamReport:
+    """ Append every response to the store as soon as it arrives, only one chunk is held in memory at a time """
+    return StoreWriter(store, start, end).feed_all(results)
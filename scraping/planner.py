@@ -0,0 +1,30 @@
+def align_up(timestamp: int, interval: int) -> int:
+    """ First candle boundary at or after timestamp """
+    return -(-timestamp // interval) * interval
+
+
+def plan_windows(start: int, end: int, interval: int, limit: int = 1000) -> list[tuple[int, int]]:
+    """
+    Split [start, end) into request windows of at most `limit` candles each.
+
+    Windows are half-open, start on candle boundaries and tile the range exactly,
+    so no candle is requested twice and every request is filled up to `limit`.
+    """
+    if interval <= 0 or limit <= 0:
+        raise ValueError(f"Interval and limit must be positive, got {interval=} {limit=}")
+
+    span = interval * limit
+    return [(first, min(first + span, end)) for first in range(align_up(start, interval), end, span)]
+
+
+def window_params(windows: list[tuple[int, int]], interval: int, limit: int = 1000) -> list[dict]:
+    """ Bitstamp /ohlc/ query params for planned windows, "end" is inclusive on the API side """
+    return [
+        {
+            "step": interval,  # seconds
+            "limit": limit,  # 1..1000
+            "start": first,
+            "end": last - 1,
+        }
+        for first, last in windows
+    ]
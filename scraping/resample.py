@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from scraping.manifest import refresh_store
+from scraping.store import STORE_DIR, CandleStore
+
+RESAMPLED_DIR = os.path.join(STORE_DIR, "resampled")
+
+
+def resample_candles(columns: dict[str, np.ndarray], timeframe: int) -> dict[str, np.ndarray]:
+    """
+    OHLCV aggregation of sorted candles into timeframe buckets (aligned to the unix epoch):
+    first open, max high, min low, last close, summed volume. Empty buckets produce no candle.
+    """
+    timestamps = columns["timestamp"]
+    if not len(timestamps):
+        return {column: np.asarray(values)[:0] for column, values in columns.items()}
+
+    buckets = timestamps - timestamps % timeframe
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(timestamps)] - 1
+    return {
+        "timestamp": buckets[starts],
+        "open": np.asarray(columns["open"])[starts],
+        "high": np.maximum.reduceat(columns["high"], starts),
+        "low": np.minimum.reduceat(columns["low"], starts),
+        "close": np.asarray(columns["close"])[ends],
+        "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+class Resampler:
+    """
+    Higher timeframes derived from the stored base series of a pair (default 1m candles),
+    cached per timeframe as CandleStores in scraping/data/store/resampled and extended incrementally.
+    Only complete buckets are cached, a bucket still waiting for base candles is rebuilt on the next update.
+    Each cache records the base meta.json it was built from (base.json): appends to the same base version extend
+    it, a new base version (write() replaced the candles) rebuilds it from scratch.
+    """
+
+    def __init__(self, currency_pair: str, base_interval: int = 60, base: CandleStore = None,
+                 store_dir: str = RESAMPLED_DIR):
+        self.currency_pair: str = currency_pair
+        self.base_interval: int = base_interval
+        self.base: CandleStore = base or CandleStore(f"{currency_pair}_{base_interval}")
+        self.store_dir: str = store_dir
+
+    def store(self, timeframe: int) -> CandleStore:
+        return CandleStore(f"{self.currency_pair}_{timeframe}", store_dir=self.store_dir)
+
+    @staticmethod
+    def built_from(store: CandleStore) -> dict | None:
+        """ Base store meta ({"version", "rows"}) the cached store was last updated from, None if unknown """
+        path = os.path.join(store.path, "base.json")
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r") as file:
+            return json.load(file)
+
+    @staticmethod
+    def _save_built_from(store: CandleStore, base_meta: dict):
+        path = os.path.join(store.path, "base.json")
+        with open(path + ".tmp", "w") as file:
+            json.dump(base_meta, file)
+        os.replace(path + ".tmp", path)
+
+    def update(self, timeframe: int) -> int:
+        """ Aggregate base candles which are not in the timeframe cache yet, returns the number of new candles """
+        if timeframe <= self.base_interval or timeframe % self.base_interval:
+            raise ValueError(f"Timeframe must be a multiple of the base interval {self.base_interval}, got {timeframe}")
+
+        store = self.store(timeframe)
+        base_meta = self.base.meta()
+        built_from = self.built_from(store)
+        if built_from == base_meta:
+            return 0
+        rebuild = (built_from is None or built_from["version"] != base_meta["version"]
+                   or built_from["rows"] > base_meta["rows"])
+
+        cached = store.read(["timestamp"])["timestamp"]
+        start = int(cached[-1]) + timeframe if len(cached) and not rebuild else None
+        base = self.base.read(start=start)
+        timestamps = base["timestamp"]
+
+        lo = hi = 0
+        if len(timestamps):
+            # A bucket is complete once the base series reaches its end
+            complete_until = int(timestamps[-1]) + self.base_interval
+            complete_until -= complete_until % timeframe
+            if start is None and timestamps[0] % timeframe:
+                # Partial head
+                lo = int(np.searchsorted(timestamps, timestamps[0] - timestamps[0] % timeframe + timeframe))
+            hi = max(lo, int(np.searchsorted(timestamps, complete_until)))
+
+        candles = resample_candles({column: values[lo:hi] for column, values in base.items()}, timeframe)
+        if rebuild:
+            store.write(candles)
+        else:
+            store.append(candles)
+        self._save_built_from(store, base_meta)
+        if rebuild or hi > lo:
+            refresh_store(store, timeframe)
+        return len(candles["timestamp"])
+
+    def load(self, timeframe: int, columns: list[str] = None, start: int = None, end: int = None) -> pd.DataFrame:
+        self.update(timeframe)
+        return self.store(timeframe).load(columns, start=start, end=end)
+
+    def load_series(self, timeframe: int, column: str = "close", start: int = None, end: int = None) -> pd.Series:
+        self.update(timeframe)
+        return self.store(timeframe).load_series(column, start=start, end=end)
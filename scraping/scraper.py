@@ -1,59 +1,147 @@
 import os
+import time
 
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.graph_objects as go
 import warnings
 
 import settings
+from profiling import profiled
+from scraping.cache import CandleCache, merge_ranges
+from scraping.cleaning import IntegrityReport, clean_candles, infer_interval
+from scraping.downsample import candle_timeframe, lttb
+from scraping.fetcher import AsyncFetcher, FetchResult
+from scraping.manifest import refresh_store
+from scraping.pipeline import StoreWriter, StreamReport
+from scraping.planner import plan_windows, window_params
+from scraping.resample import resample_candles
+from scraping.store import CandleStore
 
 # Filter out FutureWarnings from _plotly_utils.basevalidators
 warnings.filterwarnings('ignore', category=FutureWarning, module='_plotly_utils.basevalidators')
 
 
 class Scraper:
-    def __init__(self, currency_pair: str = "btcusdt"):
-        self.dates: list[int] = []
+    request_limit: int = 1000  # Candles per request, the API allows 1..1000
+
+    def __init__(self, currency_pair: str = "btcusdt", base_url: str = "https://www.bitstamp.net",
+                 fetcher: AsyncFetcher = None):
+        self.dates: list[int] = []  # [start, end) of the scraping period, request windows are planned in scrape()
         self.currency_pair: str = currency_pair
-        self.url: str = f"https://www.bitstamp.net/api/v2/ohlc/{currency_pair}/"
+        self.url: str = f"{base_url}/api/v2/ohlc/{currency_pair}/"
+        self.fetcher: AsyncFetcher = fetcher or AsyncFetcher()
         self.df: pd.DataFrame = pd.DataFrame()
+        self.interval: int | None = None
+        self.failed_requests: list[FetchResult] = []
+        self.report: IntegrityReport | None = None
 
     def set_time_range(self, range_size: int):
-        end = datetime.now()
-        start = datetime.now() - timedelta(range_size)
-        frequency = "6H"  # May be turned into a parameter if needed
-
-        dates = pd.date_range(start, end, freq=frequency)
-        self.dates = [int(x.value / 10 ** 9) for x in list(dates)]
-
-    def scrape(self, interval: int = 60, explicit: bool = False):
-        """ NOTE: Requires VPN to work. Explicit = True to inspect time intervals. """
-        from grequests import get as grequests_get, map as grequests_map  # Import here to avoid monkey-patching
-        params_list = []
-        for first, last in zip(self.dates, self.dates[1:]):
-            params = {
-                "step": interval,  # seconds
-                "limit": 1000,  # 1..1000
-                "start": first,
-                "end": last,
-            }
-            params_list.append(params)
+        end = int(time.time())
+        start = end - range_size * 24 * 60 * 60
+        self.dates = [start, end]
+
+    @profiled()
+    def scrape(self, interval: int = 60, explicit: bool = False, use_cache: bool = False):
+        """
+        NOTE: Requires VPN to work. Explicit = True to inspect time intervals.
+        Failed requests are reported and kept in self.failed_requests, the rest of the data is kept.
+        use_cache = True only requests ranges missing from the on-disk candle cache (closed candles only).
+        """
+        self.interval = interval
+        if use_cache:
+            self._scrape_cached(interval, explicit)
+            return
 
+        windows = plan_windows(self.dates[0], self.dates[-1], interval, self.request_limit)
+        params_list = window_params(windows, interval, self.request_limit)
         if explicit:
-            print("Time intervals (first/last): ")
-            for p in [params_list[0], params_list[-1]]:
-                print(
-                    datetime.fromtimestamp(p["start"]).strftime("%m/%d/%Y, %H:%M:%S"),
-                    " -> ",
-                    datetime.fromtimestamp(p["end"]).strftime("%m/%d/%Y, %H:%M:%S"),
-                )
+            self._print_params(params_list)
+        self.df = self._fetch(params_list)
+
+    def _scrape_cached(self, interval: int, explicit: bool):
+        cache = CandleCache(self.currency_pair, interval)
+        now = int(time.time())
+        start = self.dates[0]
+        end = min(self.dates[-1], now - now % interval)  # Never cache the candle which is still forming
+
+        gaps = cache.missing_ranges(start, end)
+        windows = [window for gap in gaps for window in plan_windows(*gap, interval, self.request_limit)]
+        params_list = window_params(windows, interval, self.request_limit)
+
+        if explicit:
+            print(f"Cached ranges: {len(cache.ranges)}, missing ranges: {len(gaps)}")
+        if params_list:
+            if explicit:
+                self._print_params(params_list)
+            df = self._fetch(params_list)
+            # Failed windows stay uncovered and are requested again on the next run
+            failed = {(result.params["start"], result.params["end"]) for result in self.failed_requests}
+            scraped = [
+                window for window, params in zip(windows, params_list) if (params["start"], params["end"]) not in failed
+            ]
+            cache.add(df, merge_ranges(scraped))
+        self.df = cache.load(start, end)
 
-        requests_list = (grequests_get(self.url, params=params) for params in params_list)
-        responses = grequests_map(requests_list)
+    def scrape_to_store(self, interval: int = 60, name: str = None, explicit: bool = False) -> StreamReport:
+        """
+        Stream candles straight into the columnar store (default name <pair>_<interval>) as responses arrive.
+        Memory stays flat for any range; self.df is left untouched. An existing store is resumed after its last candle.
+        """
+        writer, params_list = self.plan_store_update(interval, name)
+        if not params_list:
+            print("Store is already up to date.")
+            return writer.report
+        if explicit:
+            self._print_params(params_list)
+
+        report = writer.feed_all(self.fetcher.iter_results(self.url, params_list))
+        self.failed_requests = report.failed
+        refresh_store(writer.store, interval)
+        print(f"Stored {report.rows} candles from {report.chunks} responses, {len(report.failed)} requests failed.")
+        if report.failed:
+            print("Stopped at the first failed request, the next run resumes from there.")
+        return report
+
+    def plan_store_update(self, interval: int, name: str = None) -> tuple[StoreWriter, list[dict]]:
+        """ Writer for the store and the requests still missing from it """
+        self.interval = interval
+        store = CandleStore(name or f"{self.currency_pair}_{interval}")
+        now = int(time.time())
+        start = self.dates[0]
+        end = min(self.dates[-1], now - now % interval)  # Only closed candles, so resuming never leaves stale ones
+
+        stored_timestamps = store.read(["timestamp"])["timestamp"]
+        if len(stored_timestamps):
+            start = max(start, int(stored_timestamps[-1]) + interval)
+
+        windows = plan_windows(start, end, interval, self.request_limit)
+        return StoreWriter(store, start, end), window_params(windows, interval, self.request_limit)
+
+    @staticmethod
+    def _print_params(params_list: list[dict]):
+        print("Time intervals (first/last): ")
+        for p in [params_list[0], params_list[-1]]:
+            print(
+                datetime.fromtimestamp(p["start"]).strftime("%m/%d/%Y, %H:%M:%S"),
+                " -> ",
+                datetime.fromtimestamp(p["end"]).strftime("%m/%d/%Y, %H:%M:%S"),
+            )
+
+    @profiled()
+    def _fetch(self, params_list: list[dict]) -> pd.DataFrame:
+        results = self.fetcher.run(self.url, params_list)
+        self.failed_requests = [result for result in results if not result.ok]
+        if self.failed_requests:
+            print(f"{len(self.failed_requests)} of {len(results)} requests failed:")
+            for result in self.failed_requests:
+                params = result.params
+                print(f"  {params['start']} -> {params['end']}: {result.error} ({result.attempts} attempts)")
 
         # Nested list comprehension = flattening data
-        master_data = [item for data in responses for item in data.json()["data"]["ohlc"]]
-        self.df = pd.DataFrame(master_data)
+        master_data = [item for result in results if result.ok for item in result.candles]
+        return pd.DataFrame(master_data)
 
     def save_to_csv(self, filename: str = "data.csv"):
         """ Save to file """
@@ -65,45 +153,96 @@ class Scraper:
         else:
             print("No data available to save!")
 
+    def save_to_store(self, name: str = None):
+        """ Save to the columnar candle store, default name is <pair>_<interval> """
+        if self.df is None or self.df.empty:
+            print("No data available to save!")
+            return
+        self.clean_data()
+        store = CandleStore(name or f"{self.currency_pair}_{self.interval}")
+        store.write(self.df)
+        refresh_store(store, self.interval)
+
     def get_dataframe(self):
         self.clean_data()
         return self.df
 
-    def clean_data(self):
-        # Strip excessive data not included in time period
-        if self.df is None:
+    @profiled()
+    def clean_data(self, fill: str = None) -> IntegrityReport | None:
+        """
+        Numeric dtypes, sorted unique timestamps within the time period, gap report in self.report.
+        fill = "ffill" | "nan" fills gaps. Calling it again on already cleaned data is a no-op.
+        """
+        if self.df is None or "timestamp" not in self.df:
             print("Data not scraped yet!")
-            return
+            return None
 
-        self.df = self.df.drop_duplicates()
-        self.df["timestamp"] = self.df["timestamp"].astype(int)
-        self.df = self.df.sort_values(by="timestamp")
-        self.df = self.df[self.df["timestamp"] >= self.dates[0]]
-        self.df = self.df[self.df["timestamp"] < self.dates[-1]]
+        key = (self.dates[0], self.dates[-1], self.interval, fill)
+        if self.df.attrs.get("cleaned") == key:
+            return self.report
 
-    def visualize(self):
+        self.df, self.report = clean_candles(self.df, self.dates[0], self.dates[-1], self.interval, fill)
+        self.df.attrs["cleaned"] = key
+        if self.report.gaps:
+            print(f"Integrity: {self.report}")
+        return self.report
+
+    def visualize(self, max_points: int = 5000, mode: str = "candles", filename: str = None):
+        """
+        Level-of-detail plot: above max_points, mode = "candles" aggregates to a coarser standard timeframe,
+        mode = "line" plots the close price downsampled with LTTB.
+        filename writes a static file (.html, or an image format through kaleido) instead of opening a browser.
+        """
         self.clean_data()
-        if self.df is None:
+        if self.df is None or self.df.empty:
             print("Data not available for visualization!")
             return
 
-        self.df["datetime"] = self.df["timestamp"].apply(lambda x: pd.to_datetime(x, unit="s"))
-        fig = go.Figure(
+        if mode == "candles":
+            fig = self._candles_figure(max_points)
+        elif mode == "line":
+            fig = self._line_figure(max_points)
+        else:
+            raise ValueError(f"Unknown visualization mode {mode}, expected 'candles' or 'line'")
+
+        fig.update_layout(xaxis_rangeslider_visible=False)
+        fig.update_layout(template="plotly_dark")
+        fig.update_layout(yaxis_title=f"{self.currency_pair.upper()} pair", xaxis_title="Date-time")
+        if filename is None:
+            fig.show()
+        elif filename.endswith(".html"):
+            fig.write_html(filename, include_plotlyjs="cdn")
+        else:
+            fig.write_image(filename)
+
+    def _candles_figure(self, max_points: int) -> go.Figure:
+        columns = {column: self.df[column].to_numpy() for column in ("timestamp", "open", "high", "low", "close")}
+        columns["volume"] = self.df["volume"].to_numpy() if "volume" in self.df else np.zeros(len(self.df))
+        interval = self.interval or infer_interval(columns["timestamp"]) or 60
+        timeframe = candle_timeframe(columns["timestamp"], interval, max_points)
+        if timeframe != interval:
+            print(f"Plotting {len(self.df)} candles aggregated to {timeframe}s candles.")
+            columns = resample_candles(columns, timeframe)
+
+        return go.Figure(
             data=[
                 go.Candlestick(
-                    x=self.df["datetime"],
-                    open=self.df["open"],
-                    high=self.df["high"],
-                    low=self.df["low"],
-                    close=self.df["close"],
+                    x=pd.to_datetime(columns["timestamp"], unit="s"),
+                    open=columns["open"],
+                    high=columns["high"],
+                    low=columns["low"],
+                    close=columns["close"],
                 )
             ]
         )
 
-        fig.update_layout(xaxis_rangeslider_visible=False)
-        fig.update_layout(template="plotly_dark")
-        fig.update_layout(yaxis_title=f"{self.currency_pair.upper()} pair", xaxis_title="Date-time")
-        fig.show()
+    def _line_figure(self, max_points: int) -> go.Figure:
+        timestamps = self.df["timestamp"].to_numpy()
+        close = self.df["close"].to_numpy()
+        indices = lttb(timestamps, close, max_points)
+        return go.Figure(
+            data=[go.Scattergl(x=pd.to_datetime(timestamps[indices], unit="s"), y=close[indices], mode="lines")]
+        )
 
 
 SETUP = {
@@ -111,15 +250,20 @@ SETUP = {
     "range_size": 30,  # Number of Days in scraping period
     "interval": 60,  # Length of one cline, sec
     "filename": "data_30.csv",  # Where to save the data | None to not save
+    "store_name": "data_30",  # Columnar store to save the data to | None to not save
     "show_timestamps": False,
-    "show_plot": True
+    "show_plot": True,
+    "plot_file": None,  # e.g. "plot.html" to write the plot to a file instead of opening it
+    "use_cache": True,  # Only download candles missing from scraping/data/cache
 }
 
 if __name__ == '__main__':
     scraper = Scraper(currency_pair=SETUP["currency_pair"])
     scraper.set_time_range(range_size=SETUP["range_size"])
-    scraper.scrape(interval=SETUP["interval"], explicit=SETUP["show_timestamps"])
+    scraper.scrape(interval=SETUP["interval"], explicit=SETUP["show_timestamps"], use_cache=SETUP["use_cache"])
     if SETUP["show_plot"]:
-        scraper.visualize()
+        scraper.visualize(filename=SETUP["plot_file"])
     if SETUP["filename"]:
         scraper.save_to_csv(filename=SETUP["filename"])
+    if SETUP["store_name"]:
+        scraper.save_to_store(name=SETUP["store_name"])
@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import settings
+
+STORE_DIR = os.path.join(settings.DATA_DIR, "store")
+COLUMNS: dict[str, str] = {
+    "timestamp": "int64",
+    "open": "float64",
+    "high": "float64",
+    "low": "float64",
+    "close": "float64",
+    "volume": "float64",
+}
+
+
+class CandleStore:
+    """
+    Columnar candle storage: one raw fixed-dtype file per column, memory-mapped on read.
+
+    Layout of a store directory:
+        meta.json       -> {"version": n, "rows": m}, rewritten atomically after every change
+        v<n>/<column>   -> raw little-endian column values, sorted by timestamp
+
+    Column files may hold more than "rows" values after an interrupted append, readers clamp to "rows".
+    """
+
+    def __init__(self, name: str, store_dir: str = STORE_DIR):
+        self.name: str = name
+        self.path: str = os.path.join(store_dir, name)
+        self.meta_path: str = os.path.join(self.path, "meta.json")
+
+    def meta(self) -> dict:
+        if not os.path.isfile(self.meta_path):
+            return {"version": 0, "rows": 0}
+        with open(self.meta_path, "r") as file:
+            return json.load(file)
+
+    def _save_meta(self, meta: dict):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(meta, file)
+        os.replace(tmp_path, self.meta_path)
+
+    def column_path(self, version: int, column: str) -> str:
+        return os.path.join(self.path, f"v{version}", column)
+
+    @staticmethod
+    def _to_columns(df: pd.DataFrame | dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        missing = [column for column in COLUMNS if column not in df]
+        if missing:
+            raise ValueError(f"Candles are missing columns: {missing}")
+        return {
+            column: np.ascontiguousarray(pd.to_numeric(df[column]), dtype=dtype)
+            for column, dtype in COLUMNS.items()
+        }
+
+    def exists(self) -> bool:
+        return self.meta()["rows"] > 0
+
+    def __len__(self) -> int:
+        return self.meta()["rows"]
+
+    def write(self, df: pd.DataFrame | dict[str, np.ndarray]):
+        """ Replace the store content with df (must be sorted by timestamp) """
+        columns = self._to_columns(df)
+        old_version = self.meta()["version"]
+        version = old_version + 1
+        os.makedirs(os.path.join(self.path, f"v{version}"), exist_ok=True)
+        for column, values in columns.items():
+            values.tofile(self.column_path(version, column))
+
+        self._save_meta({"version": version, "rows": len(columns["timestamp"])})
+        shutil.rmtree(os.path.join(self.path, f"v{old_version}"), ignore_errors=True)
+
+    def append(self, df: pd.DataFrame | dict[str, np.ndarray]):
+        """ Append candles which are strictly newer than the stored ones """
+        columns = self._to_columns(df)
+        if not len(columns["timestamp"]):
+            return
+
+        meta = self.meta()
+        if meta["rows"] == 0:
+            self.write(df)
+            return
+
+        last_timestamp = self.read(["timestamp"])["timestamp"][-1]
+        if columns["timestamp"][0] <= last_timestamp:
+            raise ValueError(f"Appended candles must start after the last stored timestamp {last_timestamp}")
+
+        for column, values in columns.items():
+            with open(self.column_path(meta["version"], column), "r+b") as file:
+                # Drop leftovers of an interrupted append before writing
+                file.truncate(meta["rows"] * values.itemsize)
+                file.seek(0, os.SEEK_END)
+                values.tofile(file)
+
+        self._save_meta({"version": meta["version"], "rows": meta["rows"] + len(columns["timestamp"])})
+
+    def read(self, columns: list[str] = None, start: int = None, end: int = None) -> dict[str, np.ndarray]:
+        """
+        Zero-copy read: returns read-only memory-mapped column slices.
+        start / end select the timestamp range [start, end) in unix seconds.
+        """
+        columns = list(COLUMNS) if columns is None else columns
+        unknown = [column for column in columns if column not in COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown candle columns: {unknown}")
+
+        meta = self.meta()
+        rows = meta["rows"]
+        if rows == 0:
+            return {column: np.empty(0, dtype=COLUMNS[column]) for column in columns}
+
+        def mmap(column: str) -> np.ndarray:
+            return np.memmap(self.column_path(meta["version"], column), dtype=COLUMNS[column], mode="r", shape=(rows,))
+
+        lo, hi = 0, rows
+        if start is not None or end is not None:
+            timestamps = mmap("timestamp")
+            if start is not None:
+                lo = int(np.searchsorted(timestamps, start, side="left"))
+            if end is not None:
+                hi = int(np.searchsorted(timestamps, end, side="left"))
+        return {column: mmap(column)[lo:hi] for column in columns}
+
+    def load(self, columns: list[str] = None, start: int = None, end: int = None) -> pd.DataFrame:
+        """ Same selection as read(), materialized as a DataFrame (this copies) """
+        return pd.DataFrame({column: np.asarray(values) for column, values in self.read(columns, start, end).items()})
+
+    def load_series(self, column: str = "close", start: int = None, end: int = None) -> pd.Series:
+        """ Single column indexed by candle datetime, both backed by the memory map """
+        data = self.read(["timestamp", column], start, end)
+        index = pd.DatetimeIndex(data["timestamp"].view("datetime64[s]"), name="date")
+        return pd.Series(data[column], index=index, name=column, copy=False)
@@ -0,0 +1,65 @@
+""" Local stand-in for the Bitstamp /ohlc/ endpoint, serves deterministic synthetic candles """
+import argparse
+import math
+import random
+
+from aiohttp import web
+
+
+def synthetic_candle(timestamp: int, step: int) -> dict:
+    """ Deterministic candle for a timestamp, values are strings like in the real API """
+    price = 30000 + 1000 * math.sin(timestamp / 86400) + 50 * math.sin(timestamp / 3600)
+    spread = 5 + (timestamp // step) % 7
+    return {
+        "timestamp": str(timestamp),
+        "open": f"{price:.2f}",
+        "high": f"{price + spread:.2f}",
+        "low": f"{price - spread:.2f}",
+        "close": f"{price + spread / 2:.2f}",
+        "volume": f"{1 + (timestamp // step) % 13:.8f}",
+    }
+
+
+def create_app(failure_rate: float = 0.0, rate_limit_every: int = 0, missing: set[int] = None) -> web.Application:
+    """
+    failure_rate      -> share of requests answered with HTTP 500
+    rate_limit_every  -> every n-th request is answered with HTTP 429
+    missing           -> candle timestamps that are never served (to emulate exchange gaps)
+    """
+    state = {"requests": 0}
+    missing = missing or set()
+
+    async def ohlc(request: web.Request) -> web.Response:
+        state["requests"] += 1
+        if rate_limit_every and state["requests"] % rate_limit_every == 0:
+            return web.json_response({"code": "429"}, status=429, headers={"Retry-After": "0"})
+        if random.random() < failure_rate:
+            return web.json_response({"code": "500"}, status=500)
+
+        step = int(request.query.get("step", 60))
+        limit = int(request.query.get("limit", 1000))
+        start = int(request.query["start"])
+        end = int(request.query["end"])
+
+        first = -(-start // step) * step  # First candle boundary >= start
+        timestamps = [t for t in range(first, end + 1, step) if t not in missing][:limit]
+        return web.json_response({
+            "data": {
+                "pair": request.match_info["pair"].upper(),
+                "ohlc": [synthetic_candle(t, step) for t in timestamps],
+            }
+        })
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/api/v2/ohlc/{pair}/", ohlc)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve synthetic Bitstamp OHLC data locally")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    args = parser.parse_args()
+    web.run_app(create_app(args.failure_rate, args.rate_limit_every), port=args.port)
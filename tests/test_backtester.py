@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from backtesting.backtester import SingleStrategyBacktester
+
+CONFIG = {
+    'window': 14,
+    'entry_point': 35,
+    'exit_point': 65,
+    'num': 1,
+    'fee': 0.001,
+    'stop_loss': 0.05,
+    'take_profit': 0.1,
+    'metric': 'total_return',
+    'metrics': ['total_trades'],
+    'headless': True,
+}
+
+
+def candle_frame(rows: int = 2000) -> pd.DataFrame:
+    """ Candles shaped like Scraper.get_dataframe() returns them """
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 0.5, rows))
+    return pd.DataFrame({
+        "timestamp": 1672531200 + 60 * np.arange(rows, dtype="int64"),
+        "open": close, "high": close + 0.5, "low": close - 0.5, "close": close, "volume": np.ones(rows),
+    })
+
+
+def test_single_strategy_runs_on_a_candle_frame():
+    candles = candle_frame()
+    backtester = SingleStrategyBacktester(config=CONFIG, data=candles)
+    pf = backtester.run_backtest()
+
+    assert isinstance(backtester.data, pd.Series)
+    assert backtester.data.index[0] == pd.Timestamp("2023-01-01")
+    np.testing.assert_array_equal(backtester.data.to_numpy(), candles["close"].to_numpy())
+    assert list(backtester.results.columns) == ['total_return', 'total_trades']
+    assert len(backtester.results) == 1
+    assert backtester.results['total_return'].iloc[0] == pf.total_return()
+
+
+def test_close_series_is_used_as_is():
+    close = SingleStrategyBacktester.close_prices(candle_frame())
+    backtester = SingleStrategyBacktester(config=CONFIG, data=close)
+    backtester.run_backtest()
+
+    assert backtester.data is close
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+import scraping.cache
+from scraping.cache import CandleCache, merge_ranges
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch) -> CandleCache:
+    monkeypatch.setattr(scraping.cache, "refresh_store", lambda store, interval=None: None)
+    return CandleCache("btcusd", 60, cache_dir=str(tmp_path))
+
+
+def frame(timestamps: list[int]) -> pd.DataFrame:
+    return pd.DataFrame({"timestamp": timestamps, "open": 1.0, "high": 2.0, "low": 0.5, "close": 1.5,
+                         "volume": 3.0})
+
+
+def test_merge_ranges():
+    assert merge_ranges([(300, 600), (0, 120), (120, 180), (500, 700), (900, 900)]) == [(0, 180), (300, 700)]
+    assert merge_ranges([]) == []
+
+
+def test_missing_ranges(cache):
+    assert cache.missing_ranges(0, 600) == [(0, 600)]
+
+    cache.ranges = [(120, 240), (360, 480)]
+    assert cache.missing_ranges(0, 600) == [(0, 120), (240, 360), (480, 600)]
+    assert cache.missing_ranges(120, 240) == []
+    assert cache.missing_ranges(180, 420) == [(240, 360)]
+
+
+def test_missing_ranges_aligns_start_to_the_interval(cache):
+    cache.ranges = [(120, 600)]
+
+    # No candle starts in [90, 120): nothing is missing
+    assert cache.missing_ranges(90, 600) == []
+    assert cache.missing_ranges(30, 600) == [(60, 120)]
+
+
+def test_add_persists_candles_and_ranges(cache, tmp_path):
+    cache.add(frame([0, 60, 120, 600]), [(0, 180)])
+
+    assert cache.load(0, 1000)["timestamp"].tolist() == [0, 60, 120]
+    reopened = CandleCache("btcusd", 60, cache_dir=str(tmp_path))
+    assert reopened.ranges == [(0, 180)]
+    assert reopened.missing_ranges(0, 300) == [(180, 300)]
+
+
+def test_add_out_of_order_rewrites_sorted(cache):
+    cache.add(frame([300, 360]), [(300, 420)])
+    cache.add(frame([120, 0, 60, 60]), [(0, 180)])
+
+    assert cache.load(0, 1000)["timestamp"].tolist() == [0, 60, 120, 300, 360]
+    assert cache.ranges == [(0, 180), (300, 420)]
+
+    cache.add(frame([180, 240]), [(180, 300)])
+    assert cache.ranges == [(0, 420)]
+    assert cache.load(0, 1000)["timestamp"].tolist() == [0, 60, 120, 180, 240, 300, 360]
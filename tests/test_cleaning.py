@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraping.cleaning import clean_candles, find_gaps
+
+
+def raw_candles(timestamps: list[int]) -> pd.DataFrame:
+    """ Candles as the API returns them: string values """
+    return pd.DataFrame({
+        "timestamp": [str(t) for t in timestamps],
+        "open": [f"{100 + t / 60:.2f}" for t in timestamps],
+        "high": [f"{101 + t / 60:.2f}" for t in timestamps],
+        "low": [f"{99 + t / 60:.2f}" for t in timestamps],
+        "close": [f"{100.5 + t / 60:.2f}" for t in timestamps],
+        "volume": ["1.5" for _ in timestamps],
+    })
+
+
+def test_find_gaps():
+    assert find_gaps(np.array([0, 60, 240, 300, 420]), 60) == [(120, 240), (360, 420)]
+    assert find_gaps(np.array([0, 60, 120]), 60) == []
+
+
+def test_sorts_dedupes_and_trims():
+    df, report = clean_candles(raw_candles([180, 60, 120, 60, 0, 600]), start=60, end=600)
+
+    assert df["timestamp"].tolist() == [60, 120, 180]
+    assert df["close"].dtype == "float64"
+    assert (report.duplicates, report.out_of_range, report.was_sorted) == (1, 2, False)
+
+
+@pytest.mark.parametrize("fill", [None, "ffill", "nan"])
+def test_cleaning_is_idempotent(fill):
+    once, first = clean_candles(raw_candles([300, 0, 60, 60, 240, 600]), fill=fill)
+    twice, second = clean_candles(once, fill=fill)
+
+    pd.testing.assert_frame_equal(once, twice)
+    assert (second.duplicates, second.out_of_range, second.was_sorted) == (0, 0, True)
+
+
+def test_gaps_are_reported_and_filled():
+    df, report = clean_candles(raw_candles([0, 60, 240, 300]), interval=60, fill="ffill")
+
+    assert report.gaps == [(120, 240)]
+    assert report.missing == report.filled == 2
+    assert df["timestamp"].tolist() == [0, 60, 120, 180, 240, 300]
+    filled = df[df["timestamp"].isin([120, 180])]
+    assert (filled[["open", "high", "low", "close"]] == df.loc[1, "close"]).all().all()
+    assert (filled["volume"] == 0).all()
+
+
+def test_unknown_fill_method():
+    with pytest.raises(ValueError):
+        clean_candles(raw_candles([0, 60]), fill="bfill")
@@ -0,0 +1,26 @@
+import numpy as np
+
+from scraping.downsample import candle_timeframe, lttb
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000, dtype="float64")
+    y = np.zeros(1000)
+    y[500] = 10.0
+    indices = lttb(x, y, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 500 in indices
+
+
+def test_lttb_short_series_is_kept():
+    assert lttb(np.arange(10), np.arange(10), 20).tolist() == list(range(10))
+
+
+def test_candle_timeframe():
+    timestamps = np.arange(0, 86400 * 7, 60)
+
+    assert candle_timeframe(timestamps[:100], 60, 1000) == 60
+    assert candle_timeframe(timestamps, 60, 1000) == 900
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from aiohttp.test_utils import TestServer
+
+from scraping.fetcher import AsyncFetcher, RateLimiter
+from scraping.planner import plan_windows, window_params
+from scraping.stub_server import create_app
+
+START = 1672531200  # 2023-01-01 00:00 UTC
+
+
+async def fetch(app, params_list: list[dict], path: str = "/api/v2/ohlc/btcusd/", **fetcher_config):
+    """ Fetch params_list from the app served on an ephemeral local port """
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        fetcher = AsyncFetcher(rate_limit=1000.0, backoff=0.001, **fetcher_config)
+        return await fetcher.fetch_all(f"http://127.0.0.1:{server.port}{path}", params_list)
+    finally:
+        await server.close()
+
+
+def test_rate_limiter_spaces_acquisitions():
+    async def acquire_all(limiter: RateLimiter, n: int) -> float:
+        started = time.monotonic()
+        for _ in range(n):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire_all(RateLimiter(rate=100.0), 11)) >= 0.09
+
+
+def test_rate_limiter_allows_burst():
+    async def acquire_all(limiter: RateLimiter, n: int) -> float:
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(n)))
+        return time.monotonic() - started
+
+    assert asyncio.run(acquire_all(RateLimiter(rate=10.0, burst=5), 5)) < 0.05
+
+
+def test_fetch_all_returns_every_window_in_order():
+    params_list = window_params(plan_windows(START, START + 3000 * 60, 60, limit=1000), 60, limit=1000)
+    results = asyncio.run(fetch(create_app(), params_list))
+
+    assert [result.params for result in results] == params_list
+    assert all(result.ok and result.attempts == 1 for result in results)
+    timestamps = [int(candle["timestamp"]) for result in results for candle in result.candles]
+    assert timestamps == list(range(START, START + 3000 * 60, 60))
+
+
+def test_rate_limited_requests_are_retried():
+    params_list = window_params(plan_windows(START, START + 10 * 60, 60, limit=1), 60, limit=1)
+    results = asyncio.run(fetch(create_app(rate_limit_every=2), params_list, concurrency=1))
+
+    assert all(result.ok for result in results)
+    assert max(result.attempts for result in results) == 2
+
+
+def test_failed_requests_are_reported_after_max_retries():
+    params_list = window_params(plan_windows(START, START + 5 * 60, 60, limit=1), 60, limit=1)
+    results = asyncio.run(fetch(create_app(failure_rate=1.0), params_list, max_retries=2))
+
+    assert not any(result.ok for result in results)
+    assert all(result.attempts == 3 and result.error == "HTTP 500" for result in results)
+
+
+def test_client_errors_are_not_retried():
+    params_list = window_params(plan_windows(START, START + 60, 60), 60)
+    results = asyncio.run(fetch(create_app(), params_list, path="/api/v2/unknown/"))
+
+    assert results[0].error == "HTTP 404" and results[0].attempts == 1
+
+
+def test_missing_candles_are_not_invented():
+    params_list = window_params(plan_windows(START, START + 10 * 60, 60), 60)
+    results = asyncio.run(fetch(create_app(missing={START + 120, START + 180}), params_list))
+
+    timestamps = [int(candle["timestamp"]) for candle in results[0].candles]
+    assert timestamps == [t for t in range(START, START + 600, 60) if t not in (START + 120, START + 180)]
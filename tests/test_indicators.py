@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bot.indicators import StreamingRSI
+
+WINDOW = 14
+MINUTE = 60_000
+
+
+def closes(n: int = 300, seed: int = 7) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    return pd.Series(20_000 * np.exp(np.cumsum(rng.normal(0, 1e-3, n))))
+
+
+def wilder_rsi(close: pd.Series, window: int) -> pd.Series:
+    """ The rma smoothing ta.rsi wraps: ewm with alpha = 1 / window over the price changes """
+    change = close.diff()
+    gain = change.clip(lower=0).ewm(alpha=1 / window, min_periods=window).mean()
+    loss = (-change).clip(lower=0).ewm(alpha=1 / window, min_periods=window).mean()
+    return 100 * gain / (gain + loss)
+
+
+def klines(close: pd.Series, start: int = 1672531200000) -> list[list]:
+    return [[start + i * MINUTE, "0", "0", "0", str(price), "0"] for i, price in enumerate(close)]
+
+
+def streamed(close: pd.Series, window: int = WINDOW) -> list[float]:
+    state = StreamingRSI(window)
+    return [state.update(price) for price in close]
+
+
+def test_streaming_rsi_matches_wilder_ewm():
+    close = closes()
+    expected = wilder_rsi(close, WINDOW)
+
+    np.testing.assert_allclose(streamed(close), expected.to_numpy(), rtol=0, atol=1e-9)
+    assert all(math.isnan(value) for value in streamed(close)[:WINDOW])
+
+
+def test_streaming_rsi_matches_ta_rsi():
+    ta = pytest.importorskip("pandas_ta")
+    close = closes()
+
+    np.testing.assert_allclose(streamed(close), ta.rsi(close=close, length=WINDOW).to_numpy(), rtol=0, atol=1e-9)
+
+
+def test_feed_folds_closed_klines_and_forming_one_is_provisional():
+    close = closes(60)
+    rows = klines(close)
+    state = StreamingRSI.from_klines(rows[:40], WINDOW)
+
+    assert state.value == pytest.approx(wilder_rsi(close[:39], WINDOW).iloc[-1], abs=1e-9)
+    assert state.feed(rows[38:41]) == pytest.approx(wilder_rsi(close[:41], WINDOW).iloc[-1], abs=1e-9)
+    assert state.next_open_time == rows[40][0]
+    assert state.value == pytest.approx(wilder_rsi(close[:40], WINDOW).iloc[-1], abs=1e-9)
+
+
+def test_klines_already_folded_in_are_ignored():
+    close = closes(40)
+    rows = klines(close)
+    state = StreamingRSI.from_klines(rows, WINDOW)
+    value, changes = state.value, state.changes
+
+    assert state.update(1.0, rows[10][0]) == value
+    assert state.feed(rows[:20]) == value
+    assert state.changes == changes
+
+
+def test_window_must_be_positive():
+    with pytest.raises(ValueError):
+        StreamingRSI(0)
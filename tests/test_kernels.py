@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting.kernels import check_parity, rsi_grid_metrics
+from settings import BASE_DIR
+
+
+def close_prices(rows: int = 3000) -> pd.Series:
+    returns = np.random.default_rng(7).normal(0, 0.004, rows)
+    return pd.Series(100 * np.exp(np.cumsum(returns)), index=pd.date_range("2023-01-01", periods=rows, freq="min"))
+
+
+CELLS = np.array(np.meshgrid(np.linspace(20, 45, 6), np.linspace(55, 80, 6))).T.reshape(-1, 2)
+
+
+@pytest.mark.parametrize("stop_loss, take_profit", [(None, None), (0.01, 0.02), (0.005, None), (None, 0.01)])
+def test_kernel_matches_from_signals(stop_loss, take_profit):
+    config = {'stop_loss': stop_loss, 'take_profit': take_profit, 'fee': 0.001}
+    report = check_parity(close_prices(), 14, CELLS, config)
+
+    assert (report["max_abs_diff"] < 1e-9).all(), report
+
+
+def test_unknown_kernel_metric():
+    with pytest.raises(ValueError):
+        rsi_grid_metrics(np.ones(10), np.ones(10), CELLS, {'stop_loss': None, 'take_profit': None, 'fee': 0}, ["sharpe_ratio"])
+
+
+def test_kernel_and_process_pool_exit_cleanly():
+    """ The kernel followed by a forked process pool used to hang the interpreter at exit """
+    script = """
+import numpy as np, pandas as pd
+from backtesting.grid import evaluate_grid, make_grid
+close = pd.Series(100 + np.cumsum(np.random.default_rng(0).normal(0, 0.3, 500)))
+config = {'stop_loss': None, 'take_profit': None, 'fee': 0.001, 'metric': 'total_return'}
+grid = make_grid([10, 14], np.array([30.0]), np.array([70.0]))
+evaluate_grid(close, grid, {**config, 'engine': 'kernel'}, n_jobs=1)
+evaluate_grid(close, grid, config, n_jobs=2)
+evaluate_grid(close, grid, {**config, 'engine': 'kernel'}, n_jobs=2)
+"""
+    subprocess.run([sys.executable, "-c", script], cwd=BASE_DIR, check=True, timeout=300)
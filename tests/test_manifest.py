@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from scraping.manifest import Manifest, content_hash, find_stores
+from scraping.store import CandleStore
+
+
+def candles(timestamps) -> dict[str, np.ndarray]:
+    timestamps = np.asarray(timestamps, dtype="int64")
+    close = 100 + timestamps / 6000
+    return {"timestamp": timestamps, "open": close - 1, "high": close + 2, "low": close - 2, "close": close,
+            "volume": np.ones(len(timestamps))}
+
+
+@pytest.fixture
+def store(tmp_path) -> CandleStore:
+    store = CandleStore("btcusd_60", store_dir=str(tmp_path / "store"))
+    store.write(candles([t for t in range(0, 3600, 60) if t not in (600, 660)]))
+    return store
+
+
+@pytest.fixture
+def manifest(tmp_path) -> Manifest:
+    return Manifest(str(tmp_path / "manifest.json"))
+
+
+def test_refresh_describes_the_store(store, manifest, tmp_path):
+    entry = manifest.refresh(store, 60, with_hash=True)
+
+    assert manifest.key(store) == "store/btcusd_60"
+    assert (entry["version"], entry["rows"], entry["first"], entry["last"]) == (1, 58, 0, 3540)
+    assert entry["gaps"] == [(600, 720)]
+    assert entry["hash"] == content_hash(store)
+    saved = Manifest(manifest.path).get(store)
+    assert (saved["rows"], saved["hash"], saved["gaps"]) == (58, entry["hash"], [[600, 720]])
+    assert [found.path for found in find_stores(str(tmp_path))] == [store.path]
+
+
+def test_is_current_follows_the_store_meta(store, manifest):
+    assert not manifest.is_current(store)
+    entry = manifest.refresh(store, with_hash=True)
+    assert manifest.is_current(store) and entry["interval"] == 60
+
+    store.append(candles([3600]))
+    assert not manifest.is_current(store)
+    assert manifest.verify(store) == ["manifest entry is outdated"]
+    assert manifest.refresh(store)["hash"] is None
+    assert manifest.data_hash(store) == content_hash(store) != entry["hash"]
+
+
+def test_content_hash_is_stable_across_versions(store, manifest):
+    data_hash = manifest.data_hash(store)
+    store.write(store.load())
+
+    assert store.meta()["version"] == 2
+    assert manifest.data_hash(store) == data_hash
+    assert manifest.verify(store) == []
+
+
+def test_verify_reports_corrupted_column(store, manifest):
+    manifest.refresh(store, with_hash=True)
+    path = store.column_path(store.meta()["version"], "close")
+    with open(path, "r+b") as file:
+        file.seek(8 * 10)
+        value = file.read(8)
+        file.seek(8 * 10)
+        file.write(bytes(byte ^ 0xFF for byte in value))
+
+    assert manifest.is_current(store)
+    assert manifest.verify(store) == ["content hash mismatch"]
+
+
+def test_verify_reports_truncated_column(store, manifest):
+    manifest.refresh(store, with_hash=True)
+    with open(store.column_path(store.meta()["version"], "volume"), "r+b") as file:
+        file.truncate(8 * 50)
+
+    assert manifest.verify(store) == [f"volume: {8 * 50} bytes on disk, {8 * 58} expected"]
+
+
+def test_verify_without_entry_or_hash(store, manifest):
+    assert manifest.verify(store) == ["not in manifest"]
+    manifest.refresh(store)
+    assert manifest.verify(store) == ["no content hash recorded"]
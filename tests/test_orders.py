@@ -0,0 +1,184 @@
+import asyncio
+from collections import Counter
+from decimal import Decimal
+
+import pytest
+
+from bot.orders import OrderManager
+
+OPEN_STATUSES = {"NEW", "PARTIALLY_FILLED"}
+
+
+class StubClient:
+    """ The python-binance Client calls OrderManager makes, against an in-memory order book """
+
+    def __init__(self, min_qty: str = "0.001", step: str = "0.001"):
+        self.lot = {"filterType": "LOT_SIZE", "minQty": min_qty, "maxQty": "9000", "stepSize": step}
+        self.exchange: dict[int, dict] = {}
+        self.created: list[dict] = []
+        self.calls: Counter = Counter()
+        self.fail_create: bool = False
+
+    def get_symbol_info(self, symbol: str) -> dict:
+        self.calls["get_symbol_info"] += 1
+        return {"symbol": symbol, "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.01"}, self.lot]}
+
+    def create_order(self, **params) -> dict:
+        self.calls["create_order"] += 1
+        if self.fail_create:
+            raise ConnectionError("create_order failed")
+        self.created.append(params)
+        order_id = len(self.created)
+        self.exchange[order_id] = {"symbol": params["symbol"], "orderId": order_id, "status": "NEW",
+                                   "executedQty": "0", "cummulativeQuoteQty": "0"}
+        return dict(self.exchange[order_id])
+
+    def get_open_orders(self, symbol: str) -> list[dict]:
+        self.calls["get_open_orders"] += 1
+        return [dict(order) for order in self.exchange.values()
+                if order["symbol"] == symbol and order["status"] in OPEN_STATUSES]
+
+    def get_order(self, symbol: str, orderId: int) -> dict:
+        self.calls["get_order"] += 1
+        return dict(self.exchange[orderId])
+
+    def cancel_order(self, symbol: str, orderId: int) -> dict:
+        self.calls["cancel_order"] += 1
+        self.exchange[orderId]["status"] = "CANCELED"
+        return dict(self.exchange[orderId])
+
+    def fill(self, order_id: int, executed: str, quote: str = "0", status: str = "PARTIALLY_FILLED"):
+        self.exchange[order_id].update(status=status, executedQty=executed, cummulativeQuoteQty=quote)
+
+
+def manager(client: StubClient, **config) -> tuple[OrderManager, list, list]:
+    fills, done = [], []
+    return OrderManager(client, on_fill=fills.append, on_done=done.append, **config), fills, done
+
+
+def test_partial_fill_timeout_cancels_and_replaces_the_rest():
+    async def scenario():
+        client = StubClient()
+        orders, fills, done = manager(client, timeout=0.0)
+        try:
+            order = await orders.submit("BTCUSDT", "buy", 0.0107)
+            client.fill(order.order_id, "0.0031", "62.0")
+            await orders.poll()
+            return client, order, fills, done, orders
+        finally:
+            orders.stop()
+
+    client, order, fills, done, orders = asyncio.run(scenario())
+
+    assert order.timed_out and order.status == "CANCELED" and order.executed == pytest.approx(0.0031)
+    assert done == [order] and fills == []
+    assert client.calls["cancel_order"] == 1
+    # 0.0107 - 0.0031 = 0.0076, rounded down to the 0.001 step
+    assert client.created[-1] == {"symbol": "BTCUSDT", "side": "BUY", "type": "MARKET", "quantity": 0.007}
+    assert Decimal(str(order.replaced_by.quantity)) == Decimal("0.007")
+    assert order.replaced_by.replaces == 1
+    assert list(orders.orders) == [order.replaced_by.order_id]
+
+
+def test_rest_below_min_qty_is_not_replaced():
+    async def scenario():
+        client = StubClient(min_qty="0.01")
+        orders, fills, done = manager(client, timeout=0.0)
+        try:
+            order = await orders.submit("BTCUSDT", "sell", 0.0107)
+            client.fill(order.order_id, "0.005")
+            await orders.poll()
+            return client, order, done
+        finally:
+            orders.stop()
+
+    client, order, done = asyncio.run(scenario())
+
+    assert done == [order] and order.replaced_by is None
+    assert client.calls["create_order"] == 1
+
+
+def test_failed_replacement_still_finishes_the_order():
+    async def scenario():
+        client = StubClient()
+        orders, fills, done = manager(client, timeout=0.0)
+        try:
+            order = await orders.submit("BTCUSDT", "buy", 0.01)
+            client.fail_create = True
+            await orders.poll()
+            return order, done, orders
+        finally:
+            orders.stop()
+
+    order, done, orders = asyncio.run(scenario())
+
+    assert done == [order] and order.replaced_by is None
+    assert not orders.has_open()
+
+
+def test_poll_batches_open_orders_per_symbol():
+    async def scenario():
+        client = StubClient()
+        orders, fills, done = manager(client)
+        try:
+            placed = [await orders.submit(symbol, "buy", 0.01) for symbol in ("BTCUSDT", "BTCUSDT", "ETHUSDT")]
+            await orders.poll()
+            polled = dict(client.calls)
+            client.fill(placed[0].order_id, "0.01", "200.0", status="FILLED")
+            await orders.poll()
+            return client, placed, polled, fills, orders
+        finally:
+            orders.stop()
+
+    client, placed, polled, fills, orders = asyncio.run(scenario())
+
+    assert polled["get_open_orders"] == 2 and "get_order" not in polled
+    # The filled order left the open list: its final state is requested once
+    assert client.calls["get_open_orders"] == 4 and client.calls["get_order"] == 1
+    assert fills == [placed[0]] and placed[0].quote == pytest.approx(200.0)
+    assert set(orders.orders) == {placed[1].order_id, placed[2].order_id}
+    assert client.calls["cancel_order"] == 0
+
+
+def test_execution_report_fills_the_order():
+    async def scenario():
+        client = StubClient()
+        orders, fills, done = manager(client)
+        try:
+            order = await orders.submit("BTCUSDT", "buy", 0.01)
+            await orders.handle_execution_report({"e": "executionReport", "i": 999, "X": "FILLED", "z": "0.01",
+                                                  "Z": "1"})
+            await orders.handle_execution_report({"e": "executionReport", "i": order.order_id, "X": "FILLED",
+                                                  "z": "0.01", "Z": "200.5"})
+            await orders.poll()
+            return client, order, fills, done, orders
+        finally:
+            orders.stop()
+
+    client, order, fills, done, orders = asyncio.run(scenario())
+
+    assert fills == [order] and done == []
+    assert order.executed == pytest.approx(0.01) and order.quote == pytest.approx(200.5)
+    assert not orders.has_open()
+    assert client.calls["get_open_orders"] == 0
+
+
+def test_lot_size_is_requested_once_per_symbol():
+    async def scenario():
+        client = StubClient(min_qty="0.0001", step="0.0001")
+        orders, _, _ = manager(client)
+        try:
+            sizes = [await orders.lot_size("BTCUSDT") for _ in range(3)]
+            return client, sizes
+        finally:
+            orders.stop()
+
+    client, sizes = asyncio.run(scenario())
+
+    assert sizes == [(Decimal("0.0001"), Decimal("0.0001"))] * 3
+    assert client.calls["get_symbol_info"] == 1
+
+
+def test_unknown_timeout_policy():
+    with pytest.raises(ValueError):
+        OrderManager(StubClient(), on_timeout="ignore")
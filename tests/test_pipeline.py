@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+
+from aiohttp.test_utils import TestServer
+
+from scraping.fetcher import AsyncFetcher, FetchResult
+from scraping.pipeline import StoreWriter, stream_to_store
+from scraping.store import CandleStore
+from scraping.stub_server import create_app, synthetic_candle
+
+START = 1672531200  # 2023-01-01 00:00 UTC
+
+
+@contextmanager
+def serve_in_thread(app):
+    """ Base URL of the app served from a background thread, for the blocking iter_results """
+    loop = asyncio.new_event_loop()
+    server = TestServer(app)
+    loop.run_until_complete(server.start_server())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.port}"
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(server.close())
+        loop.close()
+
+
+def window_result(first: int, rows: int = 10, ok: bool = True) -> FetchResult:
+    params = {"start": first, "end": first + 60 * rows - 1}
+    if not ok:
+        return FetchResult(params, error="HTTP 500")
+    return FetchResult(params, [synthetic_candle(first + 60 * i, 60) for i in range(rows)])
+
+
+def test_store_ends_before_the_first_failed_window(tmp_path):
+    store = CandleStore("btcusd_60", store_dir=str(tmp_path))
+    pulled = []
+
+    def results():
+        for i, ok in enumerate([True, False, True, True]):
+            pulled.append(i)
+            yield window_result(START + 600 * i, ok=ok)
+
+    report = stream_to_store(results(), store, START, START + 2400)
+
+    assert pulled == [0, 1]
+    assert (report.rows, report.chunks, len(report.failed)) == (10, 1, 1)
+    assert store.read(["timestamp"])["timestamp"].tolist() == list(range(START, START + 600, 60))
+
+
+def test_failure_stops_the_fetch(tmp_path):
+    store = CandleStore("btcusd_60", store_dir=str(tmp_path))
+    params_list = [{"step": 60, "limit": 10, "start": START + 600 * i, "end": START + 600 * i + 599} for i in range(50)]
+    app = create_app(failure_rate=1.0)
+
+    with serve_in_thread(app) as base_url:
+        fetcher = AsyncFetcher(concurrency=2, rate_limit=1000.0, max_retries=0)
+        results = fetcher.iter_results(f"{base_url}/api/v2/ohlc/btcusd/", params_list)
+        report = StoreWriter(store, START, START + 30000).feed_all(results)
+
+    assert len(report.failed) == 1 and report.rows == 0
+    # Only the requests already in flight when the first one failed, not all 50 windows
+    assert app["state"]["requests"] <= 4
@@ -0,0 +1,36 @@
+import pytest
+
+from scraping.planner import align_up, plan_windows, window_params
+
+
+def test_align_up():
+    assert align_up(0, 60) == 0
+    assert align_up(1, 60) == 60
+    assert align_up(120, 60) == 120
+
+
+def test_windows_tile_the_range_exactly():
+    windows = plan_windows(30, 60 * 2500, 60, limit=1000)
+
+    assert windows == [(60, 60_060), (60_060, 120_060), (120_060, 150_000)]
+    assert all(first % 60 == 0 and last - first <= 60 * 1000 for first, last in windows)
+
+
+def test_empty_range_plans_no_windows():
+    assert plan_windows(600, 600, 60) == []
+
+
+def test_invalid_interval_or_limit():
+    with pytest.raises(ValueError):
+        plan_windows(0, 600, 0)
+    with pytest.raises(ValueError):
+        plan_windows(0, 600, 60, limit=0)
+
+
+def test_window_params_have_an_inclusive_end():
+    params = window_params([(0, 6000), (6000, 9000)], 60, limit=100)
+
+    assert params == [
+        {"step": 60, "limit": 100, "start": 0, "end": 5999},
+        {"step": 60, "limit": 100, "start": 6000, "end": 8999},
+    ]
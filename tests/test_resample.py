@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import scraping.resample
+from scraping.manifest import Manifest
+from scraping.resample import Resampler, resample_candles
+from scraping.store import CandleStore
+
+
+def minute_candles(timestamps: np.ndarray) -> dict[str, np.ndarray]:
+    close = 100 + np.sin(timestamps / 600)
+    return {
+        "timestamp": timestamps, "open": close - 0.1, "high": close + 0.5, "low": close - 0.5, "close": close,
+        "volume": np.ones(len(timestamps)),
+    }
+
+
+def test_resample_aggregates_ohlcv():
+    columns = minute_candles(np.arange(0, 3600 * 2, 60, dtype="int64"))
+    hourly = resample_candles(columns, 3600)
+
+    assert hourly["timestamp"].tolist() == [0, 3600]
+    assert hourly["open"][1] == columns["open"][60]
+    assert hourly["high"][0] == columns["high"][:60].max()
+    assert hourly["low"][1] == columns["low"][60:].min()
+    assert hourly["close"][0] == columns["close"][59]
+    assert hourly["volume"].tolist() == [60.0, 60.0]
+
+
+def test_resample_skips_empty_buckets():
+    timestamps = np.r_[np.arange(0, 600, 60), np.arange(1800, 2400, 60)].astype("int64")
+    resampled = resample_candles(minute_candles(timestamps), 300)
+
+    assert resampled["timestamp"].tolist() == [0, 300, 1800, 2100]
+
+
+def test_resample_empty():
+    resampled = resample_candles(minute_candles(np.empty(0, dtype="int64")), 300)
+
+    assert all(len(values) == 0 for values in resampled.values())
+
+
+@pytest.fixture
+def resampler(tmp_path, monkeypatch) -> Resampler:
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+
+    def refresh_store(store: CandleStore, interval: int = None):
+        manifest.refresh(store, interval)
+
+    monkeypatch.setattr(scraping.resample, "refresh_store", refresh_store)
+    base = CandleStore("btcusd_60", store_dir=str(tmp_path / "store"))
+    return Resampler("btcusd", base=base, store_dir=str(tmp_path / "resampled"))
+
+
+def test_resampler_extends_the_cache_with_complete_buckets(resampler):
+    resampler.base.write(minute_candles(np.arange(0, 3600 + 1800, 60, dtype="int64")))
+    assert resampler.update(3600) == 1
+    assert resampler.update(3600) == 0
+
+    resampler.base.append(minute_candles(np.arange(3600 + 1800, 3 * 3600, 60, dtype="int64")))
+    assert resampler.update(3600) == 2
+
+    expected = resample_candles(resampler.base.read(), 3600)
+    cached = resampler.store(3600).read()
+    assert all(np.array_equal(cached[column], expected[column]) for column in expected)
+    assert Resampler.built_from(resampler.store(3600)) == resampler.base.meta()
+
+
+def test_resampler_rebuilds_after_the_base_is_rewritten(resampler):
+    resampler.base.write(minute_candles(np.arange(0, 2 * 3600, 60, dtype="int64")))
+    resampler.update(3600)
+
+    # write() replaces the candles under a new version: same span, different prices
+    candles = minute_candles(np.arange(0, 2 * 3600, 60, dtype="int64"))
+    candles["close"] = candles["close"] + 10
+    resampler.base.write(candles)
+
+    assert resampler.update(3600) == 2
+    assert resampler.store(3600).read(["close"])["close"].tolist() == resample_candles(candles, 3600)["close"].tolist()
+
+    resampler.base.write(minute_candles(np.empty(0, dtype="int64")))
+    assert resampler.update(3600) == 0
+    assert len(resampler.store(3600)) == 0
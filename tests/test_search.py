@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from backtesting.grid import evaluate_grid, make_grid
+from backtesting.search import adaptive_search
+
+CONFIG = {'stop_loss': 0.02, 'take_profit': 0.03, 'fee': 0.001, 'metric': 'total_return'}
+WINDOWS = [10, 12, 14, 16]
+ENTRY_POINTS = np.linspace(20, 45, 8)
+EXIT_POINTS = np.linspace(55, 80, 8)
+
+
+def close_prices(rows: int = 3000) -> pd.Series:
+    returns = np.random.default_rng(3).normal(0, 0.003, rows)
+    return pd.Series(100 * np.exp(np.cumsum(returns)), index=pd.date_range("2023-01-01", periods=rows, freq="min"))
+
+
+def test_search_stays_within_budget_and_matches_the_grid():
+    close = close_prices()
+    results = adaptive_search(close, WINDOWS, ENTRY_POINTS, EXIT_POINTS, CONFIG, budget=60, n_jobs=1)
+    full = evaluate_grid(close, make_grid(WINDOWS, ENTRY_POINTS, EXIT_POINTS), CONFIG, n_jobs=1)
+
+    assert len(results) == 60
+    assert results.index.is_unique
+    pd.testing.assert_frame_equal(results, full.loc[results.index])
+
+
+def test_pooled_search_matches_serial_search():
+    close = close_prices()
+    serial = adaptive_search(close, WINDOWS, ENTRY_POINTS, EXIT_POINTS, CONFIG, budget=60, n_jobs=1)
+    pooled = adaptive_search(close, WINDOWS, ENTRY_POINTS, EXIT_POINTS, CONFIG, budget=60, n_jobs=2)
+
+    pd.testing.assert_frame_equal(serial, pooled)
@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from scraping.store import COLUMNS, CandleStore
+
+
+def candles(timestamps) -> dict[str, np.ndarray]:
+    timestamps = np.asarray(timestamps, dtype="int64")
+    close = 100 + timestamps / 6000
+    return {"timestamp": timestamps, "open": close - 1, "high": close + 2, "low": close - 2, "close": close,
+            "volume": np.ones(len(timestamps))}
+
+
+@pytest.fixture
+def store(tmp_path) -> CandleStore:
+    return CandleStore("btcusd_60", store_dir=str(tmp_path))
+
+
+def test_empty_store(store):
+    assert not store.exists() and len(store) == 0
+    assert store.meta() == {"version": 0, "rows": 0}
+    assert all(len(values) == 0 for values in store.read().values())
+
+
+def test_write_and_memmap_read(store):
+    store.write(candles(range(0, 600, 60)))
+
+    with open(store.meta_path, "r") as file:
+        assert json.load(file) == {"version": 1, "rows": 10}
+    assert not os.path.exists(store.meta_path + ".tmp")
+    columns = store.read()
+    assert set(columns) == set(COLUMNS)
+    assert isinstance(columns["close"], np.memmap) and not columns["close"].flags.writeable
+    assert columns["timestamp"].tolist() == list(range(0, 600, 60))
+    assert store.read(["timestamp"], start=120, end=300)["timestamp"].tolist() == [120, 180, 240]
+
+
+def test_write_bumps_version_and_removes_old_one(store):
+    store.write(candles(range(0, 600, 60)))
+    store.write(candles(range(600, 900, 60)))
+
+    assert store.meta() == {"version": 2, "rows": 5}
+    assert not os.path.exists(os.path.join(store.path, "v1"))
+    assert os.path.isfile(store.column_path(2, "close"))
+    assert store.read(["timestamp"])["timestamp"].tolist() == list(range(600, 900, 60))
+
+
+def test_append_extends_the_current_version(store):
+    store.write(candles(range(0, 300, 60)))
+    store.append(candles(range(300, 600, 60)))
+    store.append(candles([]))
+
+    assert store.meta() == {"version": 1, "rows": 10}
+    assert store.load()["timestamp"].tolist() == list(range(0, 600, 60))
+    assert store.load_series("close").index[-1].value // 10 ** 9 == 540
+
+
+def test_append_rejects_older_candles(store):
+    store.write(candles(range(0, 300, 60)))
+
+    with pytest.raises(ValueError):
+        store.append(candles([240, 300]))
+    assert len(store) == 5
+
+
+def test_append_drops_leftovers_of_an_interrupted_append(store):
+    store.write(candles(range(0, 300, 60)))
+    # Values written, then the process died before meta.json was updated
+    for column, values in candles(range(300, 420, 60)).items():
+        with open(store.column_path(1, column), "ab") as file:
+            values.tofile(file)
+
+    assert store.read(["timestamp"])["timestamp"].tolist() == list(range(0, 300, 60))
+    store.append(candles([900]))
+    assert store.read(["timestamp"])["timestamp"].tolist() == [0, 60, 120, 180, 240, 900]
+    assert os.path.getsize(store.column_path(1, "timestamp")) == 6 * 8
+
+
+def test_missing_columns_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.write({"timestamp": np.arange(3)})
+    with pytest.raises(ValueError):
+        store.read(["price"])
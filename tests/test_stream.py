@@ -0,0 +1,70 @@
+import asyncio
+
+from aiohttp.test_utils import TestServer
+
+from bot.stream import KlineStream
+from bot.stub_stream_server import START, create_app, synthetic_kline
+
+INTERVAL_MS = 60_000
+
+
+async def stream_klines(n_closed: int, last_closed: int = None, **server_options) -> tuple[list, KlineStream, dict]:
+    """
+    Run a KlineStream against the stub server on an ephemeral port until n_closed closed klines arrived, then stop it.
+    Returns the (kline, closed) updates in arrival order, the stream and the server state.
+    """
+    server = TestServer(create_app(tick=0.005, **server_options))
+    await server.start_server()
+    base = f"http://127.0.0.1:{server.port}"
+    updates = []
+    enough = asyncio.Event()
+
+    def on_kline(kline: list, closed: bool):
+        updates.append((kline, closed))
+        if sum(closed for _, closed in updates) >= n_closed:
+            enough.set()
+
+    stream = KlineStream("BTCUSDT", on_kline, ws_url=f"{base}/ws", rest_url=f"{base}/api", last_closed=last_closed,
+                         backoff=0.01, receive_timeout=5.0)
+    task = asyncio.create_task(stream.run())
+    try:
+        await asyncio.wait_for(enough.wait(), 10)
+        await stream.stop()
+        await asyncio.wait_for(task, 5)
+    finally:
+        task.cancel()
+        await server.close()
+    return updates, stream, server.app["state"]
+
+
+def closed_open_times(updates: list) -> list[int]:
+    return [kline[0] for kline, closed in updates if closed]
+
+
+def test_closed_klines_arrive_in_order_and_stop_ends_run():
+    updates, stream, state = asyncio.run(stream_klines(5))
+
+    assert closed_open_times(updates)[:5] == [START + i * INTERVAL_MS for i in range(5)]
+    assert stream.connections == state["connections"] == 1
+    assert stream.filled == 0 and state["rest_requests"] == 0
+    assert any(not closed for _, closed in updates)
+
+
+def test_reconnects_and_fills_missed_klines_exactly_once():
+    updates, stream, state = asyncio.run(stream_klines(30, drop_after=5, skip_on_reconnect=3))
+    times = closed_open_times(updates)
+
+    assert stream.connections > 1 and state["connections"] == stream.connections
+    assert stream.filled > 0 and state["rest_requests"] > 0
+    assert times == [START + i * INTERVAL_MS for i in range(len(times))]
+    assert all(kline[:6] == synthetic_kline(kline[0])[:6] for kline, closed in updates if closed)
+
+
+def test_warm_up_gap_is_filled_before_the_first_kline():
+    updates, stream, _ = asyncio.run(stream_klines(3, last_closed=START - 5 * INTERVAL_MS))
+    times = closed_open_times(updates)
+
+    assert stream.filled == 4
+    assert times[:4] == [START + i * INTERVAL_MS for i in range(-4, 0)]
+    assert times == sorted(set(times))
+    assert updates[4][0][0] == START